@@ -0,0 +1,216 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from expense_manager import ExpenseManager
+from sync_drive import install_database
+
+class AsyncExpenseManager:
+    """Async facade over ExpenseManager for use from an event loop.
+
+    Every call runs on a dedicated single-thread executor that owns its own
+    ExpenseManager connection, so slow queries never block the loop and
+    writes are serialized in the order they were awaited. With
+    concurrent=True reads go to a separate thread pool backed by the
+    manager's read connections, so they never queue behind a write.
+    """
+
+    # Re-export the exception classes so callers can catch them from here
+    Error = ExpenseManager.Error
+    DatabaseConnectionError = ExpenseManager.DatabaseConnectionError
+    DatabaseOperationError = ExpenseManager.DatabaseOperationError
+    InvalidInputError = ExpenseManager.InvalidInputError
+
+    def __init__(self, db: str, concurrent: bool = False, **manager_kwargs):
+        """Prepare the executors; the connection is opened lazily on first use.
+
+        Args:
+            db: Path to SQLite database file
+            concurrent: Open the manager in concurrent (WAL) mode and run
+                reads on their own thread pool
+            manager_kwargs: Extra ExpenseManager arguments
+        """
+        self.db = db
+        self.concurrent = concurrent
+        self.manager_kwargs = manager_kwargs
+        self._manager = None
+        self._manager_lock = threading.Lock()
+        self._executor = None
+        self._read_executor = None
+        self._in_flight = 0
+        self._reads_in_flight = 0
+        # Cleared by replace_database() to hold new reads back while it runs
+        self._reads_allowed = asyncio.Event()
+        self._reads_allowed.set()
+        self.last_used = time.monotonic()
+        # Optional coroutine function awaited with this manager before its
+        # threads start, e.g. ShardPool making room under its open limit
+        self.before_open = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the database threads (and possibly a connection) are running."""
+        return self._executor is not None
+
+    @property
+    def busy(self) -> bool:
+        """Whether a call is in progress."""
+        return self._in_flight > 0
+
+    def open(self):
+        """Start the database threads; the connection still opens on the first call."""
+        self._executors()
+
+    def _executors(self):
+        """Return (writer, reader) executors, starting them if needed."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="expenses-db")
+            self._read_executor = self._executor
+            if self.concurrent:
+                self._read_executor = ThreadPoolExecutor(
+                    max_workers=self.manager_kwargs.get('read_pool_size', 4), thread_name_prefix="expenses-db-read")
+        return self._executor, self._read_executor
+
+    def _invoke(self, func, args, kwargs):
+        # sqlite3 connections are bound to the thread that created them
+        # (unless concurrent), so the manager is created on an executor thread.
+        with self._manager_lock:
+            if self._manager is None:
+                self._manager = ExpenseManager(self.db, concurrent=self.concurrent, **self.manager_kwargs)
+            manager = self._manager
+        return func(manager, *args, **kwargs)
+
+    async def _submit(self, call, reader=False):
+        # Counted as in flight before opening, so the manager can't be
+        # released between before_open() and the call
+        self._in_flight += 1
+        try:
+            if self._executor is None and self.before_open is not None:
+                await self.before_open(self)
+            executor = self._executors()[1 if reader else 0]
+            return await asyncio.get_running_loop().run_in_executor(executor, call)
+        finally:
+            self._in_flight -= 1
+            self.last_used = time.monotonic()
+
+    async def run(self, func, *args, **kwargs):
+        """Run func(manager, *args, **kwargs) on the database thread.
+
+        Args:
+            func: Callable taking the ExpenseManager as its first argument
+
+        Returns:
+            Whatever func returns. ExpenseManager errors are re-raised as is.
+        """
+        call = functools.partial(self._invoke, func, args, kwargs)
+        return await self._submit(call)
+
+    async def read(self, func, *args, **kwargs):
+        """Like run(), but for read-only work that may use the read pool."""
+        call = functools.partial(self._invoke, func, args, kwargs)
+        await self._reads_allowed.wait()
+        self._reads_in_flight += 1
+        try:
+            return await self._submit(call, reader=True)
+        finally:
+            self._reads_in_flight -= 1
+
+    async def add(self, *args, **kwargs) -> bool:
+        return await self.run(ExpenseManager.add, *args, **kwargs)
+
+    async def add_many(self, *args, **kwargs) -> tuple:
+        return await self.run(ExpenseManager.add_many, *args, **kwargs)
+
+    async def fetch(self, *args, **kwargs):
+        return await self.read(ExpenseManager.fetch, *args, **kwargs)
+
+    async def fetch_rows(self, *args, **kwargs) -> list:
+        return await self.read(ExpenseManager.fetch_rows, *args, **kwargs)
+
+    async def fetch_page(self, *args, **kwargs) -> tuple:
+        return await self.read(ExpenseManager.fetch_page, *args, **kwargs)
+
+    async def count(self, *args, **kwargs) -> int:
+        return await self.read(ExpenseManager.count, *args, **kwargs)
+
+    async def fetch_summary(self, *args, **kwargs):
+        return await self.read(ExpenseManager.fetch_summary, *args, **kwargs)
+
+    async def fetch_filtered_summary(self, *args, **kwargs) -> dict:
+        return await self.read(ExpenseManager.fetch_filtered_summary, *args, **kwargs)
+
+    async def update_category_name(self, *args, **kwargs) -> bool:
+        return await self.run(ExpenseManager.update_category_name, *args, **kwargs)
+
+    async def delete_data(self, *args, **kwargs) -> bool:
+        return await self.run(ExpenseManager.delete_data, *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs) -> tuple:
+        return await self.run(ExpenseManager.delete_many, *args, **kwargs)
+
+    async def last_date(self):
+        """Awaitable counterpart of the ExpenseManager.last_date property."""
+        return await self.read(ExpenseManager.last_date.fget)
+
+    async def data_version(self) -> tuple:
+        """Awaitable counterpart of the ExpenseManager.data_version property."""
+        return await self.read(ExpenseManager.data_version.fget)
+
+    async def cache_stats(self) -> dict:
+        """Awaitable counterpart of the ExpenseManager.cache_stats property."""
+        return await self.read(ExpenseManager.cache_stats.fget)
+
+    async def replace_database(self, new_path):
+        """Swap in a new database file between two queued calls.
+
+        New reads are held back and running ones (on the read pool in
+        concurrent mode) finish first, so none of them uses the manager
+        while it is closed. The connection is reopened lazily on the next call.
+        """
+        def replace(_):
+            with self._manager_lock:
+                if self._manager is not None:
+                    self._manager.close()
+                    self._manager = None
+                install_database(new_path, self.db)
+
+        self._reads_allowed.clear()
+        try:
+            while self._reads_in_flight:
+                await asyncio.sleep(0.01)
+            await self._submit(functools.partial(replace, None))
+        finally:
+            self._reads_allowed.set()
+
+    async def release(self) -> bool:
+        """Close the connection and stop the database threads if no call is running.
+
+        The manager stays usable: the next call starts the threads and
+        reopens the connection.
+
+        Returns:
+            bool: False if a call was in progress and nothing was released
+        """
+        if self.busy:
+            return False
+        executor, read_executor = self._executor, self._read_executor
+        if executor is None:
+            return True
+        # Detach first, so calls made from now on start fresh threads and
+        # a fresh connection instead of racing with the close below
+        self._executor = self._read_executor = None
+        with self._manager_lock:
+            manager, self._manager = self._manager, None
+
+        if manager is not None:
+            await asyncio.get_running_loop().run_in_executor(executor, manager.close)
+        executor.shutdown(wait=False)
+        if read_executor is not executor:
+            read_executor.shutdown(wait=False)
+        return True
+
+    async def close(self):
+        """Close the connection and stop the database thread."""
+        while not await self.release():
+            await asyncio.sleep(0.05)
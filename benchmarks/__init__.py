@@ -0,0 +1,8 @@
+"""Performance benchmarks for the Expenses App.
+
+Run a benchmark module from the project root, e.g.:
+    python -m benchmarks.cli_startup
+    python -m benchmarks.suite --rows 10000 100000 --output results.json
+
+benchmarks.dataset generates the synthetic databases the suite runs on.
+"""
@@ -0,0 +1,130 @@
+"""Measure cli.py start-up time and import cost per subcommand.
+
+Every subcommand is run as a fresh process against a throw-away database
+(selected through EXPENSES_DB), so the numbers include interpreter start-up,
+imports and the command itself. One extra run per subcommand uses
+``python -X importtime`` to attribute the import cost to top-level modules.
+
+Usage:
+    python -m benchmarks.cli_startup [--runs 10] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(BASE_DIR, "cli.py")
+sys.path.insert(0, BASE_DIR)
+
+from expense_manager import ExpenseManager
+
+# Modules whose presence tells whether a subcommand pulled in a heavy dependency
+WATCHED_MODULES = ['pandas', 'numpy', 'tabulate', 'pydrive2', 'googleapiclient', 'sync_drive']
+
+def subcommands(run):
+    """Arguments for each subcommand on the given run; ids and names change per run."""
+    old, new = ('Makanan', 'Meals') if run % 2 == 0 else ('Meals', 'Makanan')
+    return {
+        'add': ['add', '2025-01-15', 'Kopi', '5000', 'Minuman'],
+        'addmany': ['addmany', '-e', '2025-01-15', 'Kopi', '5000', 'Minuman',
+                    '-e', '2025-01-15', 'Bensin', '20000', 'Transportasi'],
+        'view': ['view', '-y', '2025', '--limit', '50'],
+        'summary': ['summary', '-gb', 'month', '-p', 'all'],
+        'upcatname': ['upcatname', old, new],
+        'delete': ['delete', str(run * 3 + 1)],
+        'delmany': ['delmany', str(run * 3 + 2), str(run * 3 + 3)],
+    }
+
+def seed_database(path, rows=1000):
+    db = ExpenseManager(path)
+    entries = [(f"2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}", f"item {i}", 1000 + i, 'Makanan' if i % 2 else 'Minuman')
+               for i in range(rows)]
+    db.add_many(entries)
+    db.close()
+
+def run_cli(args, env, importtime=False):
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + [CLI] + args
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{proc.stderr}")
+    return elapsed, proc.stderr
+
+def parse_importtime(stderr):
+    """Parse -X importtime output.
+
+    Returns:
+        tuple: ({top-level module: cumulative microseconds}, set of every
+            module imported, including the ones imported indirectly)
+    """
+    modules = {}
+    loaded = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        loaded.add(name.strip())
+        # Nested imports are indented below their importer
+        if name.startswith(' ') and not name.startswith('  '):
+            modules[name.strip()] = int(cumulative)
+    return modules, loaded
+
+def benchmark(runs):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ, EXPENSES_DB=os.path.join(tmp_dir, 'bench.db'))
+        seed_database(env['EXPENSES_DB'])
+
+        baseline = [run_cli_baseline() for _ in range(runs)]
+        results['interpreter'] = {'median_ms': statistics.median(baseline) * 1000}
+
+        for name in subcommands(0):
+            timings = [run_cli(subcommands(run)[name], env)[0] for run in range(runs)]
+            _, stderr = run_cli(subcommands(runs)[name], env, importtime=True)
+            modules, loaded = parse_importtime(stderr)
+            top = sorted(modules.items(), key=lambda kv: kv[1], reverse=True)[:10]
+            results[name] = {
+                'median_ms': statistics.median(timings) * 1000,
+                'min_ms': min(timings) * 1000,
+                'max_ms': max(timings) * 1000,
+                'import_ms': sum(modules.values()) / 1000,
+                'top_imports_ms': {module: us / 1000 for module, us in top},
+                'imports': {module: any(m == module or m.startswith(module + '.') for m in loaded)
+                            for module in WATCHED_MODULES},
+            }
+    return results
+
+def run_cli_baseline():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        'benchmark': 'cli_startup',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': args.runs,
+        'results': benchmark(args.runs),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
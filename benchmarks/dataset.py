@@ -0,0 +1,108 @@
+"""Generate synthetic expense databases for the benchmarks.
+
+The data is shaped like a real expense log: dates spread over several years
+up to today, a handful of categories that hold most of the rows (Zipf-like
+skew), a small vocabulary of items per category and prices rounded to 500.
+The same seed always produces the same database.
+
+Usage:
+    python -m benchmarks.dataset bench.db --rows 100000 [--years 3] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from expense_manager import ExpenseManager
+
+# category: (items, typical price)
+CATEGORIES = {
+    'Makanan': (['Nasi Goreng', 'Mie Ayam', 'Bakso', 'Sate', 'Gado-gado', 'Soto'], 20000),
+    'Minuman': (['Kopi', 'Teh', 'Jus', 'Air Mineral', 'Boba'], 10000),
+    'Transportasi': (['Bensin', 'Ojek', 'Parkir', 'Tol', 'Kereta'], 25000),
+    'Belanja': (['Sabun', 'Sampo', 'Beras', 'Minyak', 'Telur'], 50000),
+    'Hiburan': (['Bioskop', 'Konser', 'Game', 'Streaming'], 75000),
+    'Tagihan': (['Listrik', 'Air', 'Internet', 'Pulsa'], 300000),
+    'Kesehatan': (['Obat', 'Dokter', 'Vitamin'], 100000),
+    'Pendidikan': (['Buku', 'Kursus', 'Alat Tulis'], 150000),
+    'Pakaian': (['Kaos', 'Celana', 'Sepatu', 'Jaket'], 200000),
+    'Rumah': (['Perabot', 'Perbaikan', 'Sewa'], 500000),
+    'Hadiah': (['Kado', 'Donasi'], 100000),
+    'Lainnya': (['Lain-lain'], 30000),
+}
+
+BATCH_SIZE = 10000
+
+def generate_entries(rows, years=3, seed=0, end=None):
+    """Yield `rows` (date, item, price, category) tuples.
+
+    Args:
+        rows: Number of entries to generate
+        years: Number of years the dates are spread over, ending at `end`
+        seed: Random seed
+        end: Last date of the range (default: today)
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    span = years * 365
+    start = end - timedelta(days=span - 1)
+
+    names = list(CATEGORIES)
+    cum_weights = list(accumulate(1 / rank ** 1.2 for rank in range(1, len(names) + 1)))
+
+    for _ in range(rows):
+        category = rng.choices(names, cum_weights=cum_weights)[0]
+        items, typical = CATEGORIES[category]
+        day = start + timedelta(days=rng.randrange(span))
+        price = int(rng.lognormvariate(0, 0.6) * typical) // 500 * 500
+        yield day.isoformat(), rng.choice(items), price, category
+
+def populate(db, rows, years=3, seed=0, batch_size=BATCH_SIZE):
+    """Insert synthetic rows into an open ExpenseManager in add_many() batches.
+
+    Returns:
+        float: Seconds spent inserting
+    """
+    entries = generate_entries(rows, years=years, seed=seed)
+    elapsed = 0.0
+    while True:
+        batch = [entry for _, entry in zip(range(batch_size), entries)]
+        if not batch:
+            return elapsed
+        start = time.perf_counter()
+        db.add_many(batch)
+        elapsed += time.perf_counter() - start
+
+def create_database(path, rows, years=3, seed=0):
+    """Create a new database at `path` holding `rows` synthetic expenses.
+
+    Raises:
+        FileExistsError: If `path` already exists
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    db = ExpenseManager(path)
+    try:
+        return populate(db, rows, years=years, seed=seed)
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help="Database file to create")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    elapsed = create_database(args.path, args.rows, years=args.years, seed=args.seed)
+    print(f"{args.rows} rows written to {args.path} in {elapsed:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""Time the ExpenseManager hot paths and the paginator on synthetic data.
+
+For every dataset size a fresh database is generated (see
+benchmarks.dataset) and the following are measured:
+
+- bulk ingest: the add_many() batches that build the dataset
+- add: single add() calls, one commit each
+- fetch: one query per filter type
+- fetch_summary: every group_by/period combination
+- pagination: first/next/last pages and a walk through the first pages
+- embed: ExpenseView.create_embed() for a detail page and for the summary
+  (skipped when discord.py is not installed)
+
+Queries run with the result cache disabled, so every timing hits SQLite;
+the cache is measured separately under 'cached'. The report is JSON and
+carries the git revision, so runs on two commits can be diffed directly.
+
+Usage:
+    python -m benchmarks.suite [--rows 10000 100000] [--repeat 5] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from expense_manager import ExpenseManager
+from benchmarks.dataset import BATCH_SIZE, CATEGORIES, generate_entries, populate
+
+GROUP_BY = ['category', 'year', 'month', 'day']
+PERIODS = ['all', 'today', 'this_week', 'this_month', 'this_year']
+
+def measure(func, repeat):
+    """Call func() `repeat` times; return timing statistics in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.mean(timings),
+        'min_ms': min(timings),
+        'max_ms': max(timings),
+        'runs': repeat,
+    }
+
+def git_revision():
+    try:
+        proc = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True, text=True)
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+def filter_cases(db):
+    """One filter dict per filter type, chosen to match rows of the dataset."""
+    last = db.last_date.strftime("%Y-%m-%d")
+    year, month, day = last.split('-')
+    categories = list(CATEGORIES)
+    return {
+        'none': None,
+        'year': {'year': [year]},
+        'month': {'year': [year], 'month': [month]},
+        'day': {'year': [year], 'month': [month], 'day': [day]},
+        'date_range': {'date_from': f"{year}-01-01", 'date_to': last},
+        'category_common': {'category_name': [categories[0]]},
+        'category_rare': {'category_name': [categories[-1]]},
+        'id': {'id': list(range(1, 101))},
+        'combined': {'year': [year], 'category_name': [categories[0], categories[1]]},
+    }
+
+def bench_fetch(db, repeat):
+    results = {}
+    for name, filters in filter_cases(db).items():
+        results[name] = measure(lambda: db.fetch(filters=filters), repeat)
+        results[name]['rows'] = len(db.fetch(filters=filters))
+    return results
+
+def bench_summary(db, repeat):
+    return {f"{group_by}/{period}": measure(lambda: db.fetch_summary(group_by, period), repeat)
+            for group_by in GROUP_BY for period in PERIODS}
+
+def bench_pagination(db, repeat, pages=20):
+    kwargs = {'orderby': 'date', 'desc': True, 'limit': 5, 'as_rows': True}
+    rows, _ = db.fetch_page(**kwargs)
+    after = (rows[-1].date, rows[-1].id)
+
+    def walk():
+        page, _ = db.fetch_page(**kwargs)
+        for _ in range(pages - 1):
+            page, _ = db.fetch_page(after=(page[-1].date, page[-1].id), **kwargs)
+
+    return {
+        'first': measure(lambda: db.fetch_page(**kwargs), repeat),
+        'next': measure(lambda: db.fetch_page(after=after, **kwargs), repeat),
+        'last': measure(lambda: db.fetch_page(last=True, **kwargs), repeat),
+        'by_price': measure(lambda: db.fetch_page(orderby='price', desc=True, limit=5, as_rows=True), repeat),
+        f'walk_{pages}_pages': measure(walk, repeat),
+    }
+
+def bench_embed(db, repeat):
+    try:
+        from cogs.expenses import ExpenseView
+    except ImportError as e:
+        return {'skipped': f"cannot import the paginator: {e}"}
+
+    page, total = db.fetch_page(limit=5, as_rows=True)
+
+    async def run():
+        # discord.ui.View needs a running event loop
+        view = ExpenseView(None)
+        view.total = total
+        results = {'detail': measure(lambda: view.create_embed(page), repeat)}
+        view.view_mode = 'summary'
+        # Summary mode renders fetch_filtered_summary(); time the query with it
+        results['summary'] = measure(lambda: view.create_embed(db.fetch_filtered_summary()), repeat)
+        results['summary']['rows'] = total
+        view.stop()
+        return results
+
+    return asyncio.run(run())
+
+def bench_cached(path, repeat):
+    """Repeat lookups with the result cache enabled (warm hits)."""
+    db = ExpenseManager(path)
+    try:
+        db.fetch(filters={'category_name': [list(CATEGORIES)[0]]})
+        db.fetch_summary('month', 'all')
+        db.fetch_page(as_rows=True)
+        return {
+            'fetch': measure(lambda: db.fetch(filters={'category_name': [list(CATEGORIES)[0]]}), repeat),
+            'fetch_summary': measure(lambda: db.fetch_summary('month', 'all'), repeat),
+            'fetch_page': measure(lambda: db.fetch_page(as_rows=True), repeat),
+        }
+    finally:
+        db.close()
+
+def bench_writes(path, repeat, adds):
+    db = ExpenseManager(path, cache_size=0)
+    try:
+        entries = list(generate_entries(adds, seed=1))
+        position = iter(entries)
+        add = measure(lambda: db.add(*next(position)), adds)
+
+        batch = list(generate_entries(BATCH_SIZE, seed=2))
+        add_many = measure(lambda: db.add_many(batch), repeat)
+        add_many['rows_per_batch'] = BATCH_SIZE
+        return {'add': add, 'add_many': add_many}
+    finally:
+        db.close()
+
+def prepare_database(path, rows, years, cache_dir):
+    """Create the dataset at path; returns ingest stats (None when reused from cache_dir)."""
+    if cache_dir:
+        cached = os.path.join(cache_dir, f"expenses-{rows}-{years}.db")
+        if os.path.exists(cached):
+            shutil.copyfile(cached, path)
+            return None
+
+    db = ExpenseManager(path, cache_size=0)
+    try:
+        seconds = populate(db, rows, years=years)
+    finally:
+        db.close()
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        shutil.copyfile(path, cached)
+    return {'rows': rows, 'seconds': seconds, 'rows_per_s': rows / seconds if seconds else None}
+
+def benchmark(rows, years, repeat, adds, cache_dir):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.db')
+        results = {'bulk_ingest': prepare_database(path, rows, years, cache_dir)}
+
+        db = ExpenseManager(path, cache_size=0)
+        try:
+            results['fetch'] = bench_fetch(db, repeat)
+            results['fetch_summary'] = bench_summary(db, repeat)
+            results['pagination'] = bench_pagination(db, repeat)
+            results['embed'] = bench_embed(db, repeat)
+        finally:
+            db.close()
+
+        results['cached'] = bench_cached(path, repeat)
+        # Writes last, so every read above sees the same dataset
+        results.update(bench_writes(path, repeat, adds))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000],
+                        help="Dataset sizes to benchmark")
+    parser.add_argument('--years', type=int, default=3, help="Years of data in each dataset")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per measurement")
+    parser.add_argument('--adds', type=int, default=200, help="Number of single add() calls to time")
+    parser.add_argument('--cache-dir', help="Keep generated datasets here and reuse them on later runs")
+    parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        'benchmark': 'suite',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'years': args.years,
+        'repeat': args.repeat,
+        'datasets': {},
+    }
+    for rows in args.rows:
+        print(f"Benchmarking {rows} rows...", file=sys.stderr)
+        report['datasets'][str(rows)] = benchmark(rows, args.years, args.repeat, args.adds, args.cache_dir)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(text)
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,17 @@
 import argparse
+import csv
 from datetime import datetime
-from expense_manager import ExpenseManager
+from expense_manager import ExpenseManager, ExpenseRecord
+from instrumentation import QueryStats, StatsSnapshot
+import json
 import os
-from sync_drive import get_file, upload_file
-from tabulate import tabulate
-import pandas as pd
+import sys
 
 DATABASE_NAME = "expenses.db"
 BASE_DIR = os.path.dirname(__file__)
 data_dir = os.path.join(BASE_DIR, "data")
 os.makedirs(data_dir, exist_ok=True)
-DATABASE = os.path.join(data_dir, DATABASE_NAME)
+DATABASE = os.getenv('EXPENSES_DB', os.path.join(data_dir, DATABASE_NAME))
 
 def valid_date(s):
     try:
@@ -20,6 +21,26 @@ def valid_date(s):
         msg = "Invalid date, use 'YYYY-MM-DD' format!"
         raise argparse.ArgumentTypeError(msg)
 
+def write_rows(rows, fmt, out=sys.stdout):
+    """Write ExpenseRecord rows to out one at a time, in constant memory.
+
+    'plain' is a fixed-width table without borders (suits less/more),
+    'csv' has a header row, 'jsonl' writes one JSON object per line.
+    """
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(ExpenseRecord.fields)
+        for row in rows:
+            writer.writerow(row)
+    elif fmt == 'jsonl':
+        for row in rows:
+            out.write(json.dumps(dict(zip(ExpenseRecord.fields, row))) + '\n')
+    else:
+        line = "{:>6}  {:<10}  {:<30}  {:>12}  {}\n"
+        out.write(line.format(*(x.capitalize() for x in ExpenseRecord.fields)))
+        for r in rows:
+            out.write(line.format(r.id, r.date, r.item, f"{r.price:,}", r.category_name))
+
 parser = argparse.ArgumentParser(prog="expenses")
 sp = parser.add_subparsers(dest="command")
 
@@ -37,13 +58,15 @@ p_view = sp.add_parser("view")
 p_view.add_argument("-y", "--year", action="extend", nargs='*')
 p_view.add_argument("-m", "--month", action="extend", nargs='*')
 p_view.add_argument("-d", "--day", action="extend", nargs='*')
-p_view.add_argument("--item", action="extend", nargs='+')
-p_view.add_argument("--price", action="extend", nargs='+') 
+p_view.add_argument("--item", action="extend", nargs='+', help="Search item names; 'kopi susu' needs both words, 'kop*' is a prefix")
+p_view.add_argument("--price", action="extend", nargs='+', help="Exact price or range: 50000, 50000..200000, 50000.., ..200000")
 p_view.add_argument("--category_name", action="extend", nargs='+')
 p_view.add_argument("--orderby", choices=['id', 'item', 'price', 'date', 'category_name'], default='id')
 p_view.add_argument("--limit", type=int, default=None)
 p_view.add_argument("--offset", type=int, default=None)
 p_view.add_argument('--desc', '--descending', action="store_true")
+p_view.add_argument("--format", choices=['table', 'plain', 'csv', 'jsonl'], default='table',
+                    help="'table' waits for all rows; the other formats stream rows as they are read")
 
 p_summary = sp.add_parser("summary")
 p_summary.add_argument("-gb","--group-by", type=str, default="category", choices=['category', "year", "month", "day"])
@@ -62,26 +85,66 @@ p_delmany.add_argument('id', type=int, nargs="+")
 p_drive = sp.add_parser("drive")
 p_drive.add_argument("opt", choices=["load", "save"])
 
+p_export = sp.add_parser("export")
+p_export.add_argument("path")
+p_export.add_argument("--format", choices=['parquet', 'arrow', 'csv'], help="Default: guessed from the file extension")
+p_export.add_argument("--batch-size", type=int, default=10000)
+
+p_import = sp.add_parser("import")
+p_import.add_argument("path")
+p_import.add_argument("--format", choices=['parquet', 'arrow', 'csv'], help="Default: guessed from the file extension")
+p_import.add_argument("--batch-size", type=int, default=10000)
+
+p_importcsv = sp.add_parser("import-csv", help="Import a bank statement CSV")
+p_importcsv.add_argument("path")
+p_importcsv.add_argument("--date-column", default="date", help="Header name or 0-based index")
+p_importcsv.add_argument("--item-column", default="item", help="Header name or 0-based index")
+p_importcsv.add_argument("--price-column", default="price", help="Header name or 0-based index")
+p_importcsv.add_argument("--category-column", help="Header name or 0-based index")
+p_importcsv.add_argument("--category", help="Category for rows without one")
+p_importcsv.add_argument("--date-format", default="%Y-%m-%d", help="e.g. %%d/%%m/%%Y")
+p_importcsv.add_argument("--thousands", default=".", help="Thousands separator in prices")
+p_importcsv.add_argument("--decimal", help="Decimal separator in prices, if they have decimals; must differ from --thousands")
+p_importcsv.add_argument("--delimiter", default=",")
+p_importcsv.add_argument("--encoding", default="utf-8")
+p_importcsv.add_argument("--skip-lines", type=int, default=0, help="Lines before the header to skip")
+p_importcsv.add_argument("--no-header", action="store_true", help="The file has no header row; map columns by index")
+p_importcsv.add_argument("--batch-size", type=int, default=1000)
+p_importcsv.add_argument("--reject", help="File for rejected rows (default: <path>.rejected.csv)")
+
+p_stats = sp.add_parser("stats", help="Show query statistics collected with EXPENSES_INSTRUMENT=1")
+p_stats.add_argument("--file", default=os.path.join(data_dir, "query_stats.json"))
+p_stats.add_argument("--top", type=int, default=10, help="Number of statements to list")
+p_stats.add_argument("--reset", action="store_true", help="Delete the collected statistics")
+
 p_clear = sp.add_parser("clear")
 
+p_rebuild = sp.add_parser("rebuild-rollups")
+
 args = parser.parse_args()
 
-db = ExpenseManager(DATABASE)
+# The stats command reads (or deletes) the statistics file, so it must not add to it
+db = ExpenseManager(DATABASE, concurrent=os.getenv('EXPENSES_CONCURRENT', '').lower() in ('1', 'true', 'yes'),
+                    stats=None if args.command == "stats" else QueryStats.from_env(data_dir))
 
 if args.command == "add":
     if db.add(args.date, args.item, args.price, args.category):
         print(f"Successfully added '{args.item}' to the database.")
 
 elif args.command == "addmany":
-    try:
-        for date, item, price, cat in args.entry:
+    entries = []
+    for date, item, price, cat in args.entry or []:
+        try:
             if date == '0' or date == 'x': date = args.date
-            date = valid_date(date)
-            price = int(price)
-            if db.add(date, item, price, cat):
-                print(f"Successfully added '{item}' to the database.")
-    except (ValueError, argparse.ArgumentTypeError) as e:
-        print("Error: ", e)
+            entries.append((valid_date(date), item, int(price), cat))
+        except (TypeError, ValueError, argparse.ArgumentTypeError) as e:
+            print(f"Error in '{item}': ", e)
+
+    added, errors = db.add_many(entries)
+    for i in added:
+        print(f"Successfully added '{entries[i][1]}' to the database.")
+    for i, e in errors:
+        print(f"Error in '{entries[i][1]}': ", e)
 
 elif args.command == "view":
     view_filters = {
@@ -98,17 +161,25 @@ elif args.command == "view":
     if view_filters['day'] == []: view_filters['day'].append(datetime.now().strftime('%d'))
 
     if all(x is None for x in view_filters.values()):
-        df = db.fetch(orderby=args.orderby, desc=args.desc, limit=args.limit, offset=args.offset)
+        view_filters = None
+    records = db.iter_rows(filters=view_filters, orderby=args.orderby, desc=args.desc, limit=args.limit, offset=args.offset)
+    if args.format == 'table':
+        from tabulate import tabulate
+        rows = [(r.id, r.date, r.item, f"{r.price:,}", r.category_name) for r in records]
+        headers = [x.capitalize() for x in ExpenseRecord.fields]
+        print(tabulate(rows, headers=headers, tablefmt='rounded_outline'))
     else:
-        df = db.fetch(filters=view_filters, orderby=args.orderby, desc=args.desc, limit=args.limit, offset=args.offset)
-    
-    if not df.empty and 'price' in df.columns:
-        df['price'] = df['price'].apply(lambda x: f"{x:,}")
-         
-    headers = [x.capitalize() for x in df.keys()]
-    print(tabulate(df, headers=headers, showindex=False, tablefmt='rounded_outline'))
+        try:
+            write_rows(records, args.format)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # The reader (head, a pager) went away; stop quietly
+            records.close()
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
 
 elif args.command == "summary":
+    import pandas as pd
+    from tabulate import tabulate
     summary_df = db.fetch_summary(group_by=args.group_by, period=args.period)
     if summary_df.empty:
         print("No data available for the specified period.")
@@ -131,13 +202,84 @@ elif args.command in ["delete", "del", 'd']:
         print(f"Record with ID {args.id} has been deleted.")
 
 elif args.command in ['delmany', 'dm']:
-    for id in args.id:
-        if db.delete_data(id):
-            print(f"Record with ID {id} has been deleted.")
+    deleted, missing = db.delete_many(args.id)
+    for id in deleted:
+        print(f"Record with ID {id} has been deleted.")
+    for id in missing:
+        print(f"Expense with ID {id} not found.")
 
 elif args.command == "drive":
-    if args.opt == "load": get_file(DATABASE_NAME, DATABASE)
-    elif args.opt == "save": upload_file(DATABASE_NAME, DATABASE)
+    from sync_drive import restore_database, save_database
+    # The file is replaced on load, so release our connection first
+    db.close()
+    try:
+        if args.opt == "load": restore_database(DATABASE_NAME, DATABASE)
+        elif args.opt == "save": save_database(DATABASE_NAME, DATABASE)
+    except Exception as e:
+        print(f"Error during drive {args.opt}: {e}")
+
+elif args.command == "export":
+    from data_export import export_expenses
+    try:
+        count = export_expenses(db, args.path, args.format, args.batch_size)
+        print(f"Exported {count} records to '{args.path}'.")
+    except (ImportError, ValueError, OSError) as e:
+        print(f"Error during export: {e}")
+
+elif args.command == "import":
+    from data_export import import_expenses
+    try:
+        added, errors = import_expenses(db, args.path, args.format, args.batch_size)
+        for row, e in errors:
+            print(f"Error in row {row}: ", e)
+        print(f"Imported {added} records from '{args.path}'.")
+    except (ImportError, ValueError, OSError) as e:
+        print(f"Error during import: {e}")
+
+elif args.command == "import-csv":
+    from data_export import import_statement
+    columns = {'date': args.date_column, 'item': args.item_column, 'price': args.price_column}
+    if args.category_column is not None:
+        columns['category'] = args.category_column
+    columns = {field: int(column) if column.isdigit() else column for field, column in columns.items()}
+    reject_path = args.reject or os.path.splitext(args.path)[0] + ".rejected.csv"
+
+    def show_progress(read, added, rejected):
+        print(f"\r{read} rows read, {added} added, {rejected} rejected", end='', file=sys.stderr, flush=True)
+
+    try:
+        added, rejected = import_statement(
+            db, args.path, columns,
+            date_format=args.date_format,
+            thousands=args.thousands,
+            decimal=args.decimal,
+            category=args.category,
+            delimiter=args.delimiter,
+            encoding=args.encoding,
+            skip_lines=args.skip_lines,
+            header=not args.no_header,
+            batch_size=args.batch_size,
+            reject_path=reject_path,
+            progress=show_progress
+        )
+        print(file=sys.stderr)
+        print(f"Imported {added} records from '{args.path}'.")
+        if rejected:
+            print(f"{rejected} rows rejected, see '{reject_path}'.")
+    except (ValueError, OSError) as e:
+        print(f"Error during import: {e}")
+
+elif args.command == "rebuild-rollups":
+    db.rebuild_rollups()
+    print("Summary rollup tables rebuilt.")
+
+elif args.command == "stats":
+    if args.reset:
+        if os.path.exists(args.file):
+            os.remove(args.file)
+        print("Query statistics cleared.")
+    else:
+        print(StatsSnapshot.load(args.file).report(top=args.top))
 
 elif args.command == "clear":
     cur = db.conn.cursor()
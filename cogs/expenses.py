@@ -1,11 +1,18 @@
 import discord
 from discord.ext import commands
 from expense_manager import ExpenseManager
-from sync_drive import get_file, upload_file
+from async_expense_manager import AsyncExpenseManager
+from sync_drive import BackgroundTransfers
+from instrumentation import QueryStats
+from shards import ShardPool
+import metrics
 from dotenv import load_dotenv
 import os
 from datetime import datetime
 import re
+import asyncio
+import time
+from collections import OrderedDict
 
 load_dotenv()
 
@@ -14,8 +21,60 @@ data_dir = os.path.join(BASE_DIR, "data")
 os.makedirs(data_dir, exist_ok=True)
 db_path = os.path.join(data_dir, "expenses.db")
 
-class ExpenseView(discord.ui.View):
-    def __init__(self, db: ExpenseManager, initial_filters: dict = None):
+def category_preview(manager: ExpenseManager, name: str, sample_size: int = 3) -> tuple:
+    """Return (count, total price, first rows) of a category in one trip to the database thread.
+
+    The totals come from the rollup tables and only sample_size rows are read.
+    """
+    filters = {'category_name': [name]}
+    summary = manager.fetch_filtered_summary(filters)
+    sample = manager.fetch_rows(filters=filters, limit=sample_size) if summary['count'] else []
+    return summary['count'], summary['total'], sample
+
+def page_state(manager: ExpenseManager, filters: dict) -> tuple:
+    """Return (data version, number of matching rows) in one trip to the database thread."""
+    return manager.data_version, manager.count(filters)
+
+def stop_command_timer(ctx):
+    """End the command's latency measurement now, e.g. before waiting for a confirmation click."""
+    started = getattr(ctx, 'metrics_started', None)
+    if started is not None:
+        ctx.metrics_elapsed = time.perf_counter() - started
+
+class TimedView(discord.ui.View):
+    """View whose button and select callbacks are recorded in INTERACTION_LATENCY.
+
+    The action label is the callback's name. A callback that raises, or
+    that reports a handled error with interaction.extras['failed'] = True,
+    is recorded with status 'error'.
+    """
+    metrics_name = 'view'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        for action, item in list(vars(self).items()):
+            if isinstance(item, discord.ui.Item) and item in self.children:
+                item.callback = self._timed(action, item.callback)
+
+    def _timed(self, action: str, callback):
+        async def timed_callback(interaction: discord.Interaction):
+            started = time.perf_counter()
+            status = 'error'
+            try:
+                await callback(interaction)
+                if not interaction.extras.get('failed'):
+                    status = 'ok'
+            finally:
+                metrics.INTERACTION_LATENCY.observe(time.perf_counter() - started,
+                                                    view=self.metrics_name, action=action, status=status)
+        return timed_callback
+
+class ExpenseView(TimedView):
+    metrics_name = 'expenses'
+    # Rendered pages kept per view, keyed on (filters, sort, page)
+    page_cache_size = 8
+
+    def __init__(self, db: AsyncExpenseManager, initial_filters: dict = None):
         super().__init__(timeout=180)
         self.db = db
         self.filters = initial_filters or {}
@@ -25,12 +84,103 @@ class ExpenseView(discord.ui.View):
         self.sort_desc = True
         self.view_mode = 'detail'  # 'detail' atau 'summary'
         self.message = None
-        
-        # Inisialisasi pages
-        df = self.db.fetch(filters=self.filters, desc=self.sort_desc)
-        self.pages = self.create_embed(df)
-        self.update_button_states()
+        self.total = 0
+        self.page_rows = None
+        self.embed = None
+        self.pages = OrderedDict()
+    
+    @classmethod
+    async def create(cls, db: AsyncExpenseManager, initial_filters: dict = None):
+        """Build the view and load its first page without blocking the loop."""
+        view = cls(db, initial_filters)
+        await view.load_page('first')
+        view.update_button_states()
+        return view
     
+    @property
+    def total_pages(self):
+        return max(1, -(-self.total // self.items_per_page))
+
+    def page_key(self, index):
+        """Return the (sort value, id) key of a row on the current page."""
+        row = self.page_rows[index]
+        return (getattr(row, self.sort_by), row.id)
+
+    async def load_page(self, target):
+        """Load and render only the page being shown.
+
+        target is one of 'first', 'previous', 'next' or 'last'. Pages are
+        located by the key of the neighbouring row (keyset pagination), so
+        a click never re-reads the rows of the other pages. Recently shown
+        pages are reused from self.pages until the data changes, and the
+        total comes from ExpenseManager.count(), so neither depends on the
+        size of the result.
+        """
+        if self.view_mode == 'summary':
+            # Aggregated in SQLite; no detail rows are loaded
+            summary = await self.db.fetch_filtered_summary(self.filters)
+            self.total = summary['count']
+            self.current_page = 0
+            self.embed = self.render(summary)[0]
+            return
+
+        version, self.total = await self.db.read(page_state, self.filters)
+
+        kwargs = {}
+        has_rows = bool(self.page_rows)
+        if target == 'next' and has_rows:
+            kwargs['after'] = self.page_key(-1)
+            page = self.current_page + 1
+        elif target == 'previous' and has_rows:
+            kwargs['before'] = self.page_key(0)
+            page = max(self.current_page - 1, 0)
+        elif target == 'last':
+            kwargs['last'] = True
+            page = self.total_pages - 1
+        else:
+            target = 'first'
+            page = 0
+
+        filters_key = tuple(sorted((k, tuple(v)) for k, v in self.filters.items() if v))
+        key = (filters_key, self.sort_by, self.sort_desc, page)
+        cached = self.pages.get(key)
+        if cached is not None and cached[0] == version:
+            self.pages.move_to_end(key)
+            _, self.page_rows, self.embed = cached
+            self.current_page = page
+            return
+
+        rows, _ = await self.db.fetch_page(
+            filters=self.filters,
+            orderby=self.sort_by,
+            desc=self.sort_desc,
+            limit=self.items_per_page,
+            as_rows=True,
+            count=False,
+            **kwargs
+        )
+        self.current_page = page
+
+        # The last page only holds the remainder of the rows
+        if target == 'last' and self.total % self.items_per_page:
+            rows = rows[-(self.total % self.items_per_page):]
+
+        # Rows changed underneath us; fall back to a page that exists
+        if not rows and self.total and target in ('next', 'previous'):
+            return await self.load_page('last' if target == 'next' else 'first')
+
+        self.page_rows = rows
+        self.embed = self.render(rows)[0]
+        self.pages[key] = (version, rows, self.embed)
+        self.pages.move_to_end(key)
+        while len(self.pages) > self.page_cache_size:
+            self.pages.popitem(last=False)
+
+    def render(self, data):
+        """create_embed() with its build time recorded in the metrics."""
+        with metrics.EMBED_BUILD.time(mode=self.view_mode):
+            return self.create_embed(data)
+
     async def on_timeout(self):
         for child in self.children:
             child.disabled = True
@@ -40,8 +190,9 @@ class ExpenseView(discord.ui.View):
             embed.color = discord.Color.red()
             await self.message.edit(content="Paginator expired ⌛", embed=embed, view=self)
         
-    def create_embed(self, df):
-        if df.empty:
+    def create_embed(self, data):
+        """Build the embeds for a fetch_filtered_summary() dict or a page of ExpenseRecord rows."""
+        if (data['count'] if self.view_mode == 'summary' else len(data)) == 0:
             embed = discord.Embed(
                 title="📊 Expenses",
                 description="Tidak ada data yang ditemukan",
@@ -59,54 +210,44 @@ class ExpenseView(discord.ui.View):
             )
             
             # Statistik dasar
-            summary = (f"💰 Total: Rp{df['price'].sum():,}\n"
-                    f"📊 Rata-rata: Rp{int(df['price'].mean()):,}\n"
-                    f"📈 Tertinggi: Rp{df['price'].max():,}\n"
-                    f"📉 Terendah: Rp{df['price'].min():,}\n"
-                    f"🔢 Jumlah transaksi: {len(df)}")
+            summary = (f"💰 Total: Rp{data['total']:,}\n"
+                    f"📊 Rata-rata: Rp{int(data['average'] or 0):,}\n"
+                    f"📈 Tertinggi: Rp{data['max'] or 0:,}\n"
+                    f"📉 Terendah: Rp{data['min'] or 0:,}\n"
+                    f"🔢 Jumlah transaksi: {data['count']}")
             summary_embed.add_field(name="Statistik", value=summary, inline=False)
             
             # Ringkasan per kategori
-            cat_summary = df.groupby('category_name').agg({
-                'price': ['count', 'sum', 'mean']
-            }).reset_index()
-            
-            cat_summary.columns = ['category_name', 'count', 'total', 'average']
-            
-            for _, row in cat_summary.iterrows():
-                value = (f"📝 Jumlah: {row['count']}\n"
-                        f"💰 Total: Rp{row['total']:,}\n"
-                        f"📊 Rata-rata: Rp{int(row['average']):,}")
+            for category_name, count, total, average in data['categories']:
+                value = (f"📝 Jumlah: {count}\n"
+                        f"💰 Total: Rp{total:,}\n"
+                        f"📊 Rata-rata: Rp{int(average):,}")
                 summary_embed.add_field(
-                    name=f"📁 {row['category_name']}", 
+                    name=f"📁 {category_name}", 
                     value=value, 
                     inline=True
                 )
             
             embeds.append(summary_embed)
         
-        # Detail embeds
+        # Detail embed for the current page only
         elif self.view_mode == 'detail':
-            chunks = [df.iloc[i:i + self.items_per_page] 
-                     for i in range(0, len(df), self.items_per_page)]
+            embed = discord.Embed(
+                title="📋 Detail Pengeluaran",
+                description=f"Halaman {self.current_page + 1} dari {self.total_pages}",
+                color=discord.Color.blue(),
+                timestamp=datetime.now()
+            )
             
-            for i, chunk in enumerate(chunks, 1):
-                embed = discord.Embed(
-                    title="📋 Detail Pengeluaran",
-                    description=f"Halaman {i} dari {len(chunks)}",
-                    color=discord.Color.blue(),
-                    timestamp=datetime.now()
+            for row in data:
+                harga = f"Rp{row.price:,}"
+                embed.add_field(
+                    name=f"[{row.id}] {row.item} - {harga}",
+                    value=f"📆 {row.date} | 🏷️ {row.category_name}",
+                    inline=False
                 )
-                
-                for _, row in chunk.iterrows():
-                    harga = f"Rp{row['price']:,}"
-                    embed.add_field(
-                        name=f"[{row['id']}] {row['item']} - {harga}",
-                        value=f"📆 {row['date']} | 🏷️ {row['category_name']}",
-                        inline=False
-                    )
-                
-                embeds.append(embed)
+            
+            embeds.append(embed)
         
         return embeds
         
@@ -118,48 +259,26 @@ class ExpenseView(discord.ui.View):
         else:
             self.first.disabled = self.current_page == 0
             self.previous.disabled = self.current_page == 0
-            self.next.disabled = self.current_page >= len(self.pages) - 1
-            self.last.disabled = self.current_page >= len(self.pages) - 1
+            self.next.disabled = self.current_page >= self.total_pages - 1
+            self.last.disabled = self.current_page >= self.total_pages - 1
             self.period_select.disabled = False
             self.toggle_sort_date.disabled = False
             self.toggle_sort_price.disabled = False
 
         self.toggle_view.disabled = False
 
-    async def update_view(self, interaction: discord.Interaction):
+    async def update_view(self, interaction: discord.Interaction, target='first'):
         try:
-            df = self.db.fetch(
-                filters=self.filters,
-                orderby=self.sort_by,
-                desc=self.sort_desc
-            )
-            self.pages = self.create_embed(df)
-            
-            if self.current_page >= len(self.pages):
-                self.current_page = len(self.pages) - 1 if len(self.pages) > 0 else 0
-                
+            await self.load_page(target)
             self.update_button_states()
                 
             # Update the view
             if interaction.response.is_done():
-                await interaction.message.edit(
-                    embed=self.pages[self.current_page] if self.pages else discord.Embed(
-                        title="📊 Expenses",
-                        description="Tidak ada data yang ditemukan",
-                        color=discord.Color.blue()
-                    ),
-                    view=self
-                )
+                await interaction.message.edit(embed=self.embed, view=self)
             else:
-                await interaction.response.edit_message(
-                    embed=self.pages[self.current_page] if self.pages else discord.Embed(
-                        title="📊 Expenses",
-                        description="Tidak ada data yang ditemukan",
-                        color=discord.Color.blue()
-                    ),
-                    view=self
-                )
+                await interaction.response.edit_message(embed=self.embed, view=self)
         except Exception as e:
+            interaction.extras['failed'] = True
             try:
                 content = f"Terjadi kesalahan: {str(e)}"
                 if interaction.response.is_done():
@@ -171,31 +290,24 @@ class ExpenseView(discord.ui.View):
 
     @discord.ui.button(label="⏮️", style=discord.ButtonStyle.primary)
     async def first(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page = 0
-        await self.update_view(interaction)
+        await self.update_view(interaction, 'first')
 
     @discord.ui.button(label="◀️", style=discord.ButtonStyle.primary)
     async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if self.current_page > 0:
-            self.current_page -= 1
-        await self.update_view(interaction)
+        await self.update_view(interaction, 'previous' if self.current_page > 0 else 'first')
 
     @discord.ui.button(label="▶️", style=discord.ButtonStyle.primary)
     async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if self.current_page < len(self.pages) - 1:
-            self.current_page += 1
-        await self.update_view(interaction)
+        await self.update_view(interaction, 'next' if self.current_page < self.total_pages - 1 else 'last')
 
     @discord.ui.button(label="⏭️", style=discord.ButtonStyle.primary)
     async def last(self, interaction: discord.Interaction, button: discord.ui.Button):
-        self.current_page = len(self.pages) - 1
-        await self.update_view(interaction)
+        await self.update_view(interaction, 'last')
         
     @discord.ui.button(label="🔄", style=discord.ButtonStyle.success, row=1)
     async def toggle_view(self, interaction: discord.Interaction, button: discord.ui.Button):
         self.view_mode = 'summary' if self.view_mode == 'detail' else 'detail'
-        self.current_page = 0
-        await self.update_view(interaction)
+        await self.update_view(interaction, 'first')
         
     @discord.ui.select(
         placeholder="Pilih Periode",
@@ -229,8 +341,7 @@ class ExpenseView(discord.ui.View):
         else:
             self.filters = {}
             
-        self.current_page = 0
-        await self.update_view(interaction)
+        await self.update_view(interaction, 'first')
         
     @discord.ui.button(label="📅", style=discord.ButtonStyle.secondary, row=1)
     async def toggle_sort_date(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -239,7 +350,7 @@ class ExpenseView(discord.ui.View):
         else:
             self.sort_by = 'date'
             self.sort_desc = True
-        await self.update_view(interaction)
+        await self.update_view(interaction, 'first')
         
     @discord.ui.button(label="💰", style=discord.ButtonStyle.secondary, row=1)
     async def toggle_sort_price(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -248,10 +359,12 @@ class ExpenseView(discord.ui.View):
         else:
             self.sort_by = 'price'
             self.sort_desc = True
-        await self.update_view(interaction)
+        await self.update_view(interaction, 'first')
+
+class DeleteConfirmationView(TimedView):
+    metrics_name = 'delete'
 
-class DeleteConfirmationView(discord.ui.View):
-    def __init__(self, db: ExpenseManager, to_delete: list, existing_records, not_found: list):
+    def __init__(self, db: AsyncExpenseManager, to_delete: list, existing_records, not_found: list):
         super().__init__(timeout=30)
         self.db = db
         self.to_delete = to_delete
@@ -275,12 +388,12 @@ class DeleteConfirmationView(discord.ui.View):
         # Process deletion
         succ = []
         fail = []
-        for expense_id in self.to_delete:
-            try:
-                if self.db.delete_data(expense_id):
-                    succ.append(str(expense_id))
-            except (ExpenseManager.InvalidInputError, ExpenseManager.DatabaseOperationError) as e:
-                fail.append(f"{expense_id} ({e})")
+        try:
+            deleted, missing = await self.db.delete_many(self.to_delete)
+            succ = [str(expense_id) for expense_id in deleted]
+            fail = [f"{expense_id} (tidak ditemukan)" for expense_id in missing]
+        except (ExpenseManager.InvalidInputError, ExpenseManager.DatabaseOperationError) as e:
+            fail = [f"{expense_id} ({e})" for expense_id in self.to_delete]
 
         # Prepare result message
         messages = []
@@ -305,13 +418,15 @@ class DeleteConfirmationView(discord.ui.View):
         await interaction.response.edit_message(content="❌ Penghapusan dibatalkan.", embed=embed, view=self)
         self.stop()
 
-class CategoryUpdateView(discord.ui.View):
-    def __init__(self, db: ExpenseManager, old_name: str, new_name: str):
+class CategoryUpdateView(TimedView):
+    metrics_name = 'upcatname'
+
+    def __init__(self, db: AsyncExpenseManager, old_name: str, new_name: str):
         super().__init__(timeout=30)
         self.db = db
         self.old_name = old_name
         self.new_name = new_name
-        self.affected_records = None
+        self.affected_count = 0
         self.message = None
         
     async def on_timeout(self):
@@ -326,11 +441,11 @@ class CategoryUpdateView(discord.ui.View):
         for child in self.children:
             child.disabled = True
             
-        if self.db.update_category_name(self.old_name, self.new_name):
+        if await self.db.update_category_name(self.old_name, self.new_name):
             embed = discord.Embed(
                 title="✅ Kategori Berhasil Diubah",
                 description=f"Kategori `{self.old_name}` telah diubah menjadi `{self.new_name}`\n"
-                          f"Mempengaruhi {len(self.affected_records)} data.",
+                          f"Mempengaruhi {self.affected_count} data.",
                 color=discord.Color.green(),
                 timestamp=datetime.now()
             )
@@ -354,8 +469,10 @@ class CategoryUpdateView(discord.ui.View):
         await interaction.response.edit_message(content="❌ Perubahan dibatalkan.", embed=embed, view=self)
         self.stop()
 
-class AddManyConfirmView(discord.ui.View):
-    def __init__(self, db: ExpenseManager, entries: list):
+class AddManyConfirmView(TimedView):
+    metrics_name = 'addmany'
+
+    def __init__(self, db: AsyncExpenseManager, entries: list):
         super().__init__(timeout=60)
         self.db = db
         self.entries = entries
@@ -373,18 +490,14 @@ class AddManyConfirmView(discord.ui.View):
         for child in self.children:
             child.disabled = True
         
-        success = []
-        failed = []
-        
-        for entry in self.entries:
-            try:
-                date, item, price, cat = entry['date'], entry['item'], entry['price'], entry['category']
-                if self.db.add(date, item, price, cat):
-                    success.append(item)
-                else:
-                    failed.append(f"{item} (unknown error)")
-            except Exception as e:
-                failed.append(f"{item} ({str(e)})")
+        rows = [(entry['date'], entry['item'], entry['price'], entry['category']) for entry in self.entries]
+        try:
+            added, errors = await self.db.add_many(rows)
+            success = [rows[i][1] for i in added]
+            failed = [f"{rows[i][1]} ({e})" for i, e in errors]
+        except Exception as e:
+            success = []
+            failed = [f"{item} ({str(e)})" for _, item, _, _ in rows]
         
         embed = discord.Embed(
             title="📝 Hasil Penambahan Data",
@@ -418,8 +531,10 @@ class AddManyConfirmView(discord.ui.View):
         await interaction.response.edit_message(content="❌ Penambahan data dibatalkan.", embed=embed, view=self)
         self.stop()
 
-class AddConfirmationView(discord.ui.View):
-    def __init__(self, db: ExpenseManager, date: str, item: str, price: int, category: str):
+class AddConfirmationView(TimedView):
+    metrics_name = 'add'
+
+    def __init__(self, db: AsyncExpenseManager, date: str, item: str, price: int, category: str):
         super().__init__(timeout=30) 
         self.db = db
         self.date = date
@@ -441,7 +556,7 @@ class AddConfirmationView(discord.ui.View):
             child.disabled = True
             
         try:
-            if self.db.add(self.date, self.item, self.price, self.category):
+            if await self.db.add(self.date, self.item, self.price, self.category):
                 embed = discord.Embed(
                     title="✅ Expense Added Successfully",
                     description=f"Added {self.item} (Rp{self.price:,})",
@@ -480,10 +595,37 @@ class AddConfirmationView(discord.ui.View):
 class Expense(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = ExpenseManager(db_path)
+        self.stats = QueryStats.from_env(data_dir)
+        concurrent = os.getenv('EXPENSES_CONCURRENT', '').lower() in ('1', 'true', 'yes')
+        self.db = AsyncExpenseManager(db_path, concurrent=concurrent, stats=self.stats)
+        # Opt-in: one database per guild or per user (EXPENSES_SHARD_BY)
+        self.shards = ShardPool.from_env(data_dir, concurrent=concurrent, stats=self.stats)
+        self.evictor = None
+        self.transfers = BackgroundTransfers()
+
+    async def cog_load(self):
+        if self.shards is not None:
+            self.evictor = asyncio.create_task(self.shards.run_evictor())
+
+    async def cog_unload(self):
+        if self.evictor is not None:
+            self.evictor.cancel()
+        if self.shards is not None:
+            await self.shards.close()
+        await self.db.close()
     
     def cog_check(self, ctx):
-        return ctx.channel.id == int(os.getenv('EXPENSES_CHANNEL_ID')) and ctx.prefix == '>'
+        # EXPENSES_CHANNEL_ID may list several channels (comma-separated),
+        # e.g. one per guild when sharding by guild
+        channels = {int(c) for c in os.getenv('EXPENSES_CHANNEL_ID', '').split(',') if c.strip()}
+        return ctx.channel.id in channels and ctx.prefix == '>'
+
+    async def database(self, ctx) -> AsyncExpenseManager:
+        """Return the database serving ctx: its guild's or user's shard, or the shared one."""
+        if self.shards is None:
+            return self.db
+        guild_id = ctx.guild.id if ctx.guild else None
+        return await self.shards.get(self.shards.key(guild_id, ctx.author.id))
 
     async def cog_command_error(self, ctx, error):
         if isinstance(error, commands.CheckFailure):
@@ -497,6 +639,20 @@ class Expense(commands.Cog):
                 print(f"Unhandled error in command {ctx.command}: {original}")
         else:
             await super().cog_command_error(ctx, error)
+
+    async def track_transfer(self, msg, embed, task, progress):
+        """Edit the status embed with transfer progress until the task finishes."""
+        embed.add_field(name="Progress", value=progress.describe(), inline=False)
+        while not task.done():
+            await asyncio.wait({task}, timeout=2)
+            embed.set_field_at(len(embed.fields) - 1, name="Progress", value=progress.describe(), inline=False)
+            await msg.edit(embed=embed)
+        return await task
+
+    def record_transfer(self, direction, started, progress, status):
+        metrics.TRANSFER_DURATION.observe(time.perf_counter() - started, direction=direction, status=status)
+        if progress is not None:
+            metrics.TRANSFER_BYTES.inc(progress.done, direction=direction)
     
     @commands.command()
     async def save(self, ctx):
@@ -511,9 +667,14 @@ class Expense(commands.Cog):
             timestamp=datetime.now()
         )
         msg = await ctx.send(embed=embed)
+        db = await self.database(ctx)
         
+        started = time.perf_counter()
         try:
-            upload_file('expenses.db', db_path)
+            # The backup is named after the database file: expenses.db, or the shard's file
+            task, progress = self.transfers.save(os.path.basename(db.db), db.db)
+            await self.track_transfer(msg, embed, task, progress)
+            self.record_transfer('save', started, progress, 'ok')
             embed.title = "✅ Database Saved!"
             embed.description = "Successfully backed up to cloud storage."
             embed.add_field(
@@ -523,6 +684,7 @@ class Expense(commands.Cog):
             )
             embed.color = discord.Color.green()
         except Exception as e:
+            self.record_transfer('save', started, None, 'error')
             embed.title = "❌ Save Failed!"
             embed.description = f"Error: {str(e)}"
             embed.color = discord.Color.red()
@@ -542,9 +704,14 @@ class Expense(commands.Cog):
             timestamp=datetime.now()
         )
         msg = await ctx.send(embed=embed)
+        db = await self.database(ctx)
         
+        started = time.perf_counter()
         try:
-            get_file('expenses.db', db_path)
+            task, progress = self.transfers.load(os.path.basename(db.db), db.db)
+            new_path = await self.track_transfer(msg, embed, task, progress)
+            await db.replace_database(new_path)
+            self.record_transfer('load', started, progress, 'ok')
             embed.title = "✅ Database Loaded!"
             embed.description = "Successfully restored from cloud storage."
             embed.add_field(
@@ -554,6 +721,7 @@ class Expense(commands.Cog):
             )
             embed.color = discord.Color.green()
         except Exception as e:
+            self.record_transfer('load', started, None, 'error')
             embed.title = "❌ Load Failed!"
             embed.description = f"Error: {str(e)}"
             embed.color = discord.Color.red()
@@ -607,8 +775,10 @@ class Expense(commands.Cog):
         embed.add_field(name="🏷️ Category", value=category, inline=True)
 
         # Send confirmation view
-        view = AddConfirmationView(self.db, date, item, price_clean, category)
+        view = AddConfirmationView(await self.database(ctx), date, item, price_clean, category)
         view.message = await ctx.send(embed=embed, view=view)
+        # The time until the user clicks is not the command's latency
+        stop_command_timer(ctx)
         await view.wait()
 
     @commands.command(name='a')
@@ -628,7 +798,7 @@ class Expense(commands.Cog):
         tanggal = match_tanggal.group(1)
         date = datetime.strptime(tanggal, '%d/%m/%Y').strftime('%Y-%m-%d')
 
-        added = []
+        rows = []
         errors = []
         for price_s, cat, item in items_found:
             try:
@@ -636,14 +806,16 @@ class Expense(commands.Cog):
             except ValueError:
                 errors.append(f"{item}: harga '{price_s}' tidak valid")
                 continue
+            rows.append((date, item, price, cat))
 
-            try:
-                if self.db.add(date, item, price, cat):
-                    added.append(item)
-            except ExpenseManager.InvalidInputError as e:
-                errors.append(f"{item}: input tidak valid ({e})")
-            except ExpenseManager.DatabaseOperationError as e:
-                errors.append(f"{item}: DB error ({e})")
+        added = []
+        try:
+            db = await self.database(ctx)
+            added_idx, invalid = await db.add_many(rows)
+            added = [rows[i][1] for i in added_idx]
+            errors.extend(f"{rows[i][1]}: input tidak valid ({e})" for i, e in invalid)
+        except ExpenseManager.DatabaseOperationError as e:
+            errors.extend(f"{item}: DB error ({e})" for _, item, _, _ in rows)
 
         if added:
             await ctx.send("Berhasil menambahkan: " + ", ".join(added))
@@ -728,8 +900,10 @@ class Expense(commands.Cog):
             )
             
         # Send confirmation view
-        view = AddManyConfirmView(self.db, entries)
+        view = AddManyConfirmView(await self.database(ctx), entries)
         view.message = await ctx.send(embed=embed, view=view)
+        # The time until the user clicks is not the command's latency
+        stop_command_timer(ctx)
         
         # Wait for interaction
         await view.wait()
@@ -746,17 +920,22 @@ class Expense(commands.Cog):
             month=MM         - Filter by month
             day=DD           - Filter by day
             cat=category     - Filter by category
+            item=text        - Search item names (kop* = prefix)
+            price=range      - Exact price or range (50.000..200.000, 1.000.000..);
+                               separate several with ';' since ',' may group thousands
             
         Examples:
             >view                    - Show current month
             >view month=09          - Show September expenses
             >view year=2025        - Show entire year
             >view cat=Food         - Show expenses by category
+            >view "item=mie ayam"  - Search all expenses for an item
+            >view year=2025 price=1.000.000.. - Large purchases this year
         """
         # Parse arguments
         filters = {
             'year': [], 'month': [], 'day': [], 
-            'category_name': []
+            'category_name': [], 'item': [], 'price': []
         }
 
         for arg in args:
@@ -774,6 +953,11 @@ class Expense(commands.Cog):
 
                 if key == 'cat':
                     filters['category_name'].extend(val.split(','))
+                elif key == 'item':
+                    filters['item'].extend(val.split(','))
+                elif key == 'price':
+                    # ',' is a thousands separator in prices (50,000..200,000)
+                    filters['price'].extend(v for v in val.split(';') if v.strip())
                 elif key in filters:
                     for v in val.split(','):
                         if v.isdigit():
@@ -789,9 +973,11 @@ class Expense(commands.Cog):
                 await ctx.send('❌ Format tidak valid. Contoh: `>view month=09`', delete_after=8)
                 return
 
-        # Set default filters for current month if no date filters specified
-        if not any(filters[k] for k in ['year', 'month', 'day']):
-            last_date = self.db.last_date
+        db = await self.database(ctx)
+        # Set default filters for current month if no date filters specified;
+        # an item search covers the whole history
+        if not any(filters[k] for k in ['year', 'month', 'day', 'item']):
+            last_date = await db.last_date()
             if last_date is None:
                 await ctx.send('❌ No data found in database.', delete_after=8)
                 return
@@ -799,13 +985,13 @@ class Expense(commands.Cog):
             filters['month'] = [last_date.strftime('%m')]
 
         try:
-            view = ExpenseView(self.db, filters)
+            view = await ExpenseView.create(db, filters)
             
-            if not view.pages:
+            if not view.total:
                 await ctx.send('❌ Tidak ada data yang ditemukan!')
                 return
                 
-            message = await ctx.send(embed=view.pages[0], view=view)
+            message = await ctx.send(embed=view.embed, view=view)
             view.message = message
         except Exception as e:
             await ctx.send(f"❌ Terjadi kesalahan: {str(e)}")
@@ -837,8 +1023,9 @@ class Expense(commands.Cog):
         ids = [int(id_str) for id_str in args]
         
         # Get existing records first to verify they exist
-        existing_records = self.db.fetch(filters={'id': ids})
-        existing_ids = existing_records['id'].tolist()
+        db = await self.database(ctx)
+        existing_records = await db.fetch_rows(filters={'id': ids})
+        existing_ids = {row.id for row in existing_records}
         
         not_found = [str(id) for id in ids if id not in existing_ids]
         to_delete = [id for id in ids if id in existing_ids]
@@ -854,15 +1041,17 @@ class Expense(commands.Cog):
             timestamp=datetime.now()
         )
         
-        for _, row in existing_records.iterrows():
+        for row in existing_records:
             embed.add_field(
-                name=f"ID {row['id']}: {row['item']}",
-                value=f"💰 Rp{row['price']:,}\n📅 {row['date']}\n🏷️ {row['category_name']}",
+                name=f"ID {row.id}: {row.item}",
+                value=f"💰 Rp{row.price:,}\n📅 {row.date}\n🏷️ {row.category_name}",
                 inline=True
             )
 
-        view = DeleteConfirmationView(self.db, to_delete, existing_records, not_found)
+        view = DeleteConfirmationView(db, to_delete, existing_records, not_found)
         view.message = await ctx.send(embed=embed, view=view)
+        # The time until the user clicks is not the command's latency
+        stop_command_timer(ctx)
         
         await view.wait()
     
@@ -881,8 +1070,9 @@ class Expense(commands.Cog):
             >upcatname Food Meals
             >upcatname Transport Transportation
         """
-        df = self.db.fetch(filters={'category_name': [old_name]})
-        if df.empty:
+        db = await self.database(ctx)
+        affected_count, total_amount, sample = await db.read(category_preview, old_name)
+        if not affected_count:
             await ctx.send(f"❌ Kategori `{old_name}` tidak ditemukan!")
             return
             
@@ -894,9 +1084,6 @@ class Expense(commands.Cog):
         )
         
         # Add statistics
-        total_amount = df['price'].sum()
-        affected_count = len(df)
-        
         embed.add_field(
             name="📊 Statistik",
             value=f"🔢 Jumlah data: {affected_count}\n"
@@ -905,24 +1092,46 @@ class Expense(commands.Cog):
         )
         
         # Add sample data
-        sample = df.head(3)
         samples = []
-        for _, row in sample.iterrows():
-            samples.append(f"• {row['item']} (Rp{row['price']:,})")
+        for row in sample:
+            samples.append(f"• {row.item} (Rp{row.price:,})")
         
-        if not df.empty:
+        if sample:
             embed.add_field(
                 name="📋 Contoh Data",
                 value="\n".join(samples) + 
-                      ("\n..." if len(df) > 3 else ""),
+                      ("\n..." if affected_count > 3 else ""),
                 inline=False
             )
             
-        view = CategoryUpdateView(self.db, old_name, new_name)
-        view.affected_records = df
+        view = CategoryUpdateView(db, old_name, new_name)
+        view.affected_count = affected_count
         view.message = await ctx.send(embed=embed, view=view)
+        # The time until the user clicks is not the command's latency
+        stop_command_timer(ctx)
         
         await view.wait()
 
+    @commands.command()
+    @commands.is_owner()
+    async def dbstats(self, ctx, top: int = 5):
+        """Show database latency statistics (owner only).
+        
+        Needs EXPENSES_INSTRUMENT=1. Lists per-method latency percentiles
+        and the statements with the highest total time since the bot started.
+        
+        Usage:
+            >dbstats [top]
+        """
+        if self.stats is None:
+            await ctx.send("❌ Instrumentasi tidak aktif. Set `EXPENSES_INSTRUMENT=1` lalu restart bot.", delete_after=10)
+            return
+
+        report = self.stats.snapshot().report(top=top)
+        # Keep the code block within Discord's 2000 character limit
+        if len(report) > 1900:
+            report = report[:1900] + "\n..."
+        await ctx.send(f"```\n{report}\n```")
+
 async def setup(bot):
     await bot.add_cog(Expense(bot))
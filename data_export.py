@@ -0,0 +1,309 @@
+"""Export and import the expense table as Parquet, Arrow IPC or CSV.
+
+Rows are streamed in batches of a bounded size in both directions: export
+reads them from a cursor (ExpenseManager.iter_rows) and import hands each
+batch to ExpenseManager.add_many, so memory use does not depend on the
+size of the table. pyarrow is only needed for the Parquet and Arrow
+formats and is imported when one of them is used.
+
+import_statement() loads bank-statement CSV exports with their own column
+layout, date format and number formatting in the same batched way.
+"""
+import csv
+import os
+from datetime import datetime
+from itertools import chain
+from expense_manager import ExpenseManager, ExpenseRecord
+
+FORMATS = ['parquet', 'arrow', 'csv']
+EXTENSIONS = {'.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow', '.csv': 'csv'}
+BATCH_SIZE = 10000
+
+# Columns read back on import; the id is reassigned by the database
+IMPORT_COLUMNS = ['date', 'item', 'price', 'category_name']
+
+def guess_format(path: str) -> str:
+    """Return the export format matching the file extension of path.
+
+    Raises:
+        ValueError: If the extension is not known
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXTENSIONS:
+        raise ValueError(f"Cannot guess the format of '{path}', use one of {FORMATS}")
+    return EXTENSIONS[ext]
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("The parquet and arrow formats need pyarrow: pip install pyarrow") from None
+    return pa
+
+def _schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('date', pa.string()),
+        ('item', pa.string()),
+        ('price', pa.int64()),
+        ('category_name', pa.string()),
+    ])
+
+def _batches(rows, batch_size):
+    """Group an iterable into lists of at most batch_size items."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def export_expenses(db: ExpenseManager, path: str, fmt: str = None, batch_size: int = BATCH_SIZE) -> int:
+    """Write every expense, joined with its category name, to path.
+
+    Args:
+        db: Open ExpenseManager
+        path: Output file
+        fmt: 'parquet', 'arrow' or 'csv'; guessed from the extension if None
+        batch_size: Rows per written batch (Parquet row group / Arrow record batch)
+
+    Returns:
+        int: Number of rows written
+    """
+    fmt = fmt or guess_format(path)
+    rows = db.iter_rows(orderby='id')
+    count = 0
+
+    if fmt == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(ExpenseRecord.fields)
+            for batch in _batches(rows, batch_size):
+                writer.writerows(batch)
+                count += len(batch)
+        return count
+
+    pa = _pyarrow()
+    schema = _schema(pa)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(path, schema)
+    elif fmt == 'arrow':
+        writer = pa.ipc.new_file(path, schema)
+    else:
+        raise ValueError(f"Unknown format '{fmt}', use one of {FORMATS}")
+
+    with writer:
+        for batch in _batches(rows, batch_size):
+            columns = [list(column) for column in zip(*batch)]
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            count += len(batch)
+    return count
+
+def _read_csv(path, batch_size):
+    with open(path, newline='', encoding='utf-8') as fh:
+        reader = csv.DictReader(fh)
+        missing = set(IMPORT_COLUMNS) - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"'{path}' is missing the columns {sorted(missing)}")
+        for batch in _batches(reader, batch_size):
+            yield [tuple(row[column] for column in IMPORT_COLUMNS) for row in batch]
+
+def _read_arrow(path, fmt, batch_size):
+    pa = _pyarrow()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=IMPORT_COLUMNS)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        batches = (reader.get_batch(i).select(IMPORT_COLUMNS) for i in range(reader.num_record_batches))
+
+    for record_batch in batches:
+        columns = [record_batch.column(name).to_pylist() for name in IMPORT_COLUMNS]
+        # Arrow IPC batches keep the size they were written with
+        rows = list(zip(*columns))
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+def import_expenses(db: ExpenseManager, path: str, fmt: str = None, batch_size: int = BATCH_SIZE) -> tuple:
+    """Load expenses written by export_expenses() into db.
+
+    Each batch is inserted with add_many(), i.e. validated and committed in
+    one transaction. Ids are not preserved; the rows get new ids in file
+    order.
+
+    Args:
+        db: Open ExpenseManager
+        path: Input file
+        fmt: 'parquet', 'arrow' or 'csv'; guessed from the extension if None
+        batch_size: Rows per transaction
+
+    Returns:
+        tuple: (number of rows added, list of (row number, error message)
+            for the rejected rows; row numbers start at 1)
+    """
+    fmt = fmt or guess_format(path)
+    if fmt == 'csv':
+        batches = _read_csv(path, batch_size)
+    elif fmt in ('parquet', 'arrow'):
+        batches = _read_arrow(path, fmt, batch_size)
+    else:
+        raise ValueError(f"Unknown format '{fmt}', use one of {FORMATS}")
+
+    added = 0
+    errors = []
+    number = 0
+    for batch in batches:
+        entries = []
+        numbers = []
+        for date, item, price, category in batch:
+            number += 1
+            try:
+                entries.append((date, item, int(price), category))
+                numbers.append(number)
+            except (TypeError, ValueError):
+                errors.append((number, f"Invalid price: {price!r}"))
+        done, failed = db.add_many(entries)
+        added += len(done)
+        errors.extend((numbers[index], message) for index, message in failed)
+    errors.sort()
+    return added, errors
+
+def _check_separators(thousands: str, decimal: str):
+    """Raise ValueError if the thousands and decimal separators are the same."""
+    if decimal and thousands == decimal:
+        raise ValueError(f"The thousands and decimal separators must differ, both are '{decimal}'")
+
+def parse_price(value: str, thousands: str = '.', decimal: str = None) -> int:
+    """Parse a formatted amount such as 'Rp 1.250.000' or '-25.000,50'.
+
+    The thousands separator is removed (as the Discord commands do with
+    price.replace('.', '')) and a decimal part, if a decimal separator is
+    given, is rounded to whole rupiah. The two separators must differ:
+    '1234.56' with '.' as both would otherwise read as 123456.
+
+    Raises:
+        ValueError: If value is not a number or the separators are the same
+    """
+    _check_separators(thousands, decimal)
+    text = value.strip()
+    if text.lower().startswith('rp'):
+        text = text[2:].strip()
+    if thousands:
+        text = text.replace(thousands, '')
+    if decimal:
+        return round(float(text.replace(decimal, '.')))
+    return int(text)
+
+def import_statement(db: ExpenseManager, path: str, columns: dict, date_format: str = '%Y-%m-%d',
+                     thousands: str = '.', decimal: str = None, category: str = None, delimiter: str = ',',
+                     encoding: str = 'utf-8', skip_lines: int = 0, header: bool = True, batch_size: int = 1000,
+                     reject_path: str = None, progress=None) -> tuple:
+    """Stream a bank-statement CSV into db in batched transactions.
+
+    The file is read row by row and every batch of valid rows is inserted
+    with add_many(). Rows that cannot be parsed or fail validation are
+    written to reject_path, with the reason in an extra 'error' column,
+    instead of stopping the import, so they can be fixed and imported again.
+
+    Args:
+        db: Open ExpenseManager
+        path: CSV file to read
+        columns: Maps 'date', 'item', 'price' and optionally 'category' to a
+            header name, or to a 0-based column index
+        date_format: strptime() format of the date column
+        thousands: Thousands separator removed from prices
+        decimal: Decimal separator of prices, None for whole numbers
+        category: Category used when there is no category column or it is empty
+        delimiter: CSV field delimiter
+        encoding: File encoding
+        skip_lines: Lines to skip before the header (bank export preambles)
+        header: Whether the first row is a header; without one, columns
+            must be mapped by index
+        batch_size: Rows per transaction
+        reject_path: CSV file receiving the rejected rows; only created when
+            a row is rejected
+        progress: Optional callable(rows read, rows added, rows rejected),
+            called after every batch
+
+    Returns:
+        tuple: (number of rows added, number of rows rejected)
+
+    Raises:
+        ValueError: If a mapped column is not in the header, no category is
+            available or the thousands and decimal separators are the same
+    """
+    _check_separators(thousands, decimal)
+    if 'category' not in columns and not category:
+        raise ValueError("Map a category column or give a default category")
+
+    added = 0
+    rejected = 0
+    read = 0
+    with open(path, newline='', encoding=encoding) as fh:
+        for _ in range(skip_lines):
+            fh.readline()
+        reader = csv.reader(fh, delimiter=delimiter)
+        if header:
+            header = next(reader, [])
+        else:
+            first = next(reader, [])
+            header = [f"column{i}" for i in range(len(first))]
+            reader = chain([first], reader)
+        indexes = {}
+        for field, column in columns.items():
+            if isinstance(column, int):
+                indexes[field] = column
+            elif column in header:
+                indexes[field] = header.index(column)
+            else:
+                raise ValueError(f"Column '{column}' not found in the header {header}")
+
+        reject_file = None
+        try:
+            for batch in _batches(reader, batch_size):
+                entries = []
+                sources = []
+                failures = []
+                for row in batch:
+                    if not any(field.strip() for field in row):
+                        continue
+                    read += 1
+                    try:
+                        entries.append(_statement_entry(row, indexes, date_format, thousands, decimal, category))
+                        sources.append(row)
+                    except (IndexError, ValueError) as e:
+                        failures.append((row, str(e)))
+
+                done, invalid = db.add_many(entries) if entries else ([], [])
+                added += len(done)
+                failures.extend((sources[index], message) for index, message in invalid)
+                rejected += len(failures)
+                if failures and reject_path:
+                    # Only create the reject file once there is something to put in it
+                    if reject_file is None:
+                        reject_file = open(reject_path, 'w', newline='', encoding='utf-8')
+                        rejects = csv.writer(reject_file, delimiter=delimiter)
+                        rejects.writerow(header + ['error'])
+                    rejects.writerows(row + [message] for row, message in failures)
+                if progress:
+                    progress(read, added, rejected)
+        finally:
+            if reject_file:
+                reject_file.close()
+    return added, rejected
+
+def _statement_entry(row, indexes, date_format, thousands, decimal, default_category):
+    """Turn one statement row into a (date, item, price, category) entry."""
+    try:
+        date = datetime.strptime(row[indexes['date']].strip(), date_format).strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"Invalid date '{row[indexes['date']]}', expected format {date_format}") from None
+    try:
+        price = parse_price(row[indexes['price']], thousands, decimal)
+    except ValueError:
+        raise ValueError(f"Invalid price '{row[indexes['price']]}'") from None
+    category = row[indexes['category']].strip() if 'category' in indexes else ''
+    return date, row[indexes['item']].strip(), price, category or default_category
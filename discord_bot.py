@@ -3,6 +3,8 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 import asyncio
+import time
+import metrics
 
 async def main():
     load_dotenv()
@@ -19,6 +21,31 @@ async def main():
     @bot.event
     async def on_ready():
         print(f'{bot.user.name} has connected')
+
+    def record_command(ctx, status):
+        started = getattr(ctx, 'metrics_started', None)
+        if started is None or ctx.command is None:
+            return
+        labels = {'cog': ctx.cog.qualified_name if ctx.cog else '', 'command': ctx.command.qualified_name, 'status': status}
+        # Commands that wait for a confirmation click stop the timer when they send the prompt
+        elapsed = getattr(ctx, 'metrics_elapsed', None)
+        if elapsed is None:
+            elapsed = time.perf_counter() - started
+        metrics.COMMAND_LATENCY.observe(elapsed, **labels)
+        metrics.COMMANDS_TOTAL.inc(**labels)
+
+    # Listeners, so the default error handler stays in place
+    @bot.listen('on_command')
+    async def start_command_timer(ctx):
+        ctx.metrics_started = time.perf_counter()
+
+    @bot.listen('on_command_completion')
+    async def command_completed(ctx):
+        record_command(ctx, 'ok')
+
+    @bot.listen('on_command_error')
+    async def command_failed(ctx, error):
+        record_command(ctx, 'error')
     
     @bot.command(name='reload', hidden=True)
     @commands.is_owner()
@@ -31,7 +58,15 @@ async def main():
         except Exception as e:
             print(e)
 
-    await bot.start(TOKEN)
+    # Prometheus metrics on METRICS_PORT and/or METRICS_FILE, if configured.
+    # Keep the tasks referenced so they aren't garbage-collected while running
+    bot.metrics_tasks = metrics.start_exporter()
+
+    try:
+        await bot.start(TOKEN)
+    finally:
+        for task in bot.metrics_tasks:
+            task.cancel()
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -1,6 +1,55 @@
+import functools
+import inspect
+import itertools
+import queue
 import sqlite3
-import pandas as pd
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+# pandas is imported only where a DataFrame is built, so pandas-free callers
+# (add, delete, iter_rows, ...) don't pay for importing it.
+if TYPE_CHECKING:
+    import pandas as pd
+    from instrumentation import QueryStats
+
+class ExpenseRecord(namedtuple('ExpenseRecord', ('id', 'date', 'item', 'price', 'category_name'))):
+    """Lightweight expense row returned by the pandas-free query methods.
+    
+    A named tuple, so it can be passed wherever a plain tuple is expected.
+    Records are immutable, which lets the result cache hand out the same
+    records to every caller.
+    """
+    __slots__ = ()
+    fields = ('id', 'date', 'item', 'price', 'category_name')
+
+# Numbers every ExpenseManager, so data_version tokens of different
+# connections (e.g. before and after a reopen) never compare equal
+_instance_ids = itertools.count()
+
+def _record_factory(cursor, row):
+    return ExpenseRecord(*row)
+
+def _instrumented(method):
+    """Time calls to an ExpenseManager method when instrumentation is on."""
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def generator_wrapper(self, *args, **kwargs):
+            if self.stats is None:
+                return method(self, *args, **kwargs)
+            return self.stats.timed_generator(method.__name__, method(self, *args, **kwargs))
+        return generator_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.stats is None:
+            return method(self, *args, **kwargs)
+        with self.stats.timed(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class ExpenseManager:
     """Manages expense records in SQLite database."""
@@ -36,21 +85,189 @@ class ExpenseManager:
         FOREIGN KEY (category_id) REFERENCES category (id)
     );'''
 
-    def __init__(self, db: str):
+    # Pre-aggregated per-(day|month|all time) x category statistics, kept in
+    # sync with the expenses table by the triggers below.
+    ROLLUP_LEVELS = [
+        # (table, key column, expression deriving the key from a row)
+        ('rollup_daily', 'date', '{row}.date'),
+        ('rollup_monthly', 'month', 'substr({row}.date, 1, 7)'),
+        ('rollup_category', None, None),
+    ]
+
+    # fetch() filters that rollup_daily can answer: whole days and categories
+    ROLLUP_FILTERS = {'year', 'month', 'day', 'date_from', 'date_to', 'category_name'}
+
+    CREATE_ROLLUP_TABLES = [
+        '''CREATE TABLE IF NOT EXISTS rollup_daily (
+            date TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            transaction_count INTEGER NOT NULL,
+            total_amount INTEGER,
+            min_amount INTEGER,
+            max_amount INTEGER,
+            PRIMARY KEY (date, category_id)
+        );''',
+        '''CREATE TABLE IF NOT EXISTS rollup_monthly (
+            month TEXT NOT NULL,
+            category_id INTEGER NOT NULL,
+            transaction_count INTEGER NOT NULL,
+            total_amount INTEGER,
+            min_amount INTEGER,
+            max_amount INTEGER,
+            PRIMARY KEY (month, category_id)
+        );''',
+        '''CREATE TABLE IF NOT EXISTS rollup_category (
+            category_id INTEGER PRIMARY KEY,
+            transaction_count INTEGER NOT NULL,
+            total_amount INTEGER,
+            min_amount INTEGER,
+            max_amount INTEGER
+        );''',
+        'CREATE INDEX IF NOT EXISTS idx_rollup_monthly_category ON rollup_monthly(category_id);',
+    ]
+
+    # Full-text index over expenses.item for the 'item' filter. It is an
+    # external-content table: only the index is stored, the text stays in
+    # expenses and the triggers keep the two in sync.
+    CREATE_SEARCH_INDEX = [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+            item,
+            content='expenses',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        );''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_insert AFTER INSERT ON expenses BEGIN
+            INSERT INTO expenses_fts (rowid, item) VALUES (NEW.id, NEW.item);
+        END;''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_delete AFTER DELETE ON expenses BEGIN
+            INSERT INTO expenses_fts (expenses_fts, rowid, item) VALUES ('delete', OLD.id, OLD.item);
+        END;''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_update AFTER UPDATE OF item ON expenses BEGIN
+            INSERT INTO expenses_fts (expenses_fts, rowid, item) VALUES ('delete', OLD.id, OLD.item);
+            INSERT INTO expenses_fts (rowid, item) VALUES (NEW.id, NEW.item);
+        END;''',
+    ]
+
+    def __init__(self, db: str, cache_size: int = 128, concurrent: bool = False,
+                 read_pool_size: int = 4, busy_timeout: float = 5.0, checkpoint_interval: float = 60.0,
+                 stats: 'QueryStats' = None):
         """Initialize database connection.
         
         Args:
             db: Path to SQLite database file
+            cache_size: Maximum number of query results kept in the result
+                cache; 0 disables caching
+            concurrent: Switch the database to WAL mode and serve reads from a
+                pool of read-only connections, so other processes (e.g. the
+                CLI next to the bot) and readers never wait on a writer
+            read_pool_size: Number of idle read connections kept open in
+                concurrent mode
+            busy_timeout: Seconds to wait for a lock held by another process
+            checkpoint_interval: Minimum seconds between the passive WAL
+                checkpoints run after commits in concurrent mode
+            stats: instrumentation.QueryStats recording call and statement
+                timings; None (the default) disables instrumentation
             
         Raises:
             DatabaseConnectionError: If connection to database fails
         """
         self.db = db
+        self.cache_size = cache_size
+        self.concurrent = concurrent
+        self.read_pool_size = read_pool_size
+        self.busy_timeout = busy_timeout
+        self.checkpoint_interval = checkpoint_interval
+        self.stats = stats
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        self._instance_id = next(_instance_ids)
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._readers = queue.Queue()
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+        self._closed = False
+        self._last_checkpoint = time.monotonic()
+        self._category_ids = {}
+        self._category_version = None
+        self.has_search_index = False
         try:
-            self.conn = sqlite3.connect(self.db)
-            self.create_tables()
+            self.conn = self._connect()
+            if self.concurrent:
+                self.conn.execute("PRAGMA journal_mode = WAL;")
+                self.conn.execute("PRAGMA synchronous = NORMAL;")
+            # Schema setup is not part of the measured workload
+            with self._unrecorded():
+                self.create_tables()
+                self._category_id_map()
+            if self.concurrent:
+                # Watches commits from every connection, see _cached()
+                self._monitor = self._connect()
         except sqlite3.Error as e:
             raise self.DatabaseConnectionError(f"Failed to connect to database: {e}")
+
+    def _connect(self, readonly: bool = False) -> sqlite3.Connection:
+        """Open a connection; in concurrent mode it may be used from any thread."""
+        if self.stats is None:
+            conn = sqlite3.connect(self.db, timeout=self.busy_timeout, check_same_thread=not self.concurrent)
+        else:
+            from instrumentation import InstrumentedConnection
+            conn = sqlite3.connect(self.db, timeout=self.busy_timeout, check_same_thread=not self.concurrent,
+                                   factory=InstrumentedConnection)
+            conn.stats = self.stats
+        if readonly:
+            conn.execute("PRAGMA query_only = ON;")
+        return conn
+
+    @contextmanager
+    def _unrecorded(self):
+        """Keep the calls and statements run inside out of the query stats."""
+        stats, self.stats = self.stats, None
+        if stats is not None:
+            self.conn.stats = None
+        try:
+            yield
+        finally:
+            self.stats = stats
+            if stats is not None:
+                self.conn.stats = stats
+
+    @contextmanager
+    def _reading(self):
+        """Borrow a connection for a read query.
+
+        Outside concurrent mode this is the single connection. In concurrent
+        mode it comes from the read pool, so WAL lets it read the last
+        committed data while a write is in progress.
+        """
+        if not self.concurrent:
+            yield self.conn
+            return
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect(readonly=True)
+        try:
+            yield conn
+        finally:
+            # A connection borrowed before close() must not go back to the pool
+            if not self._closed and self._readers.qsize() < self.read_pool_size:
+                self._readers.put(conn)
+            else:
+                conn.close()
+
+    def checkpoint(self, mode: str = 'PASSIVE'):
+        """Copy WAL content back into the database file.
+        
+        Args:
+            mode: 'PASSIVE', 'FULL', 'RESTART' or 'TRUNCATE'
+        """
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise self.InvalidInputError(f"Invalid checkpoint mode: {mode}")
+        self.conn.execute(f"PRAGMA wal_checkpoint({mode});")
+        self._last_checkpoint = time.monotonic()
     
     def __enter__(self):
         self.conn = sqlite3.connect(self.db)
@@ -68,13 +285,230 @@ class ExpenseManager:
             self.CREATE_EXPENSES_TABLE,
             'CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date);',
             'CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category_id);',
+            # Price filters: alone, within a date range and within a category
+            'CREATE INDEX IF NOT EXISTS idx_expenses_price ON expenses(price);',
+            'CREATE INDEX IF NOT EXISTS idx_expenses_date_price ON expenses(date, price);',
+            'CREATE INDEX IF NOT EXISTS idx_expenses_category_price ON expenses(category_id, price);',
+            # One day of one category, for the rollup triggers' MIN/MAX recompute
+            'CREATE INDEX IF NOT EXISTS idx_expenses_date_category_price ON expenses(date, category_id, price);',
             "PRAGMA foreign_keys = ON;"
         ]
         cur = self.conn.cursor()
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollup_category';")
+        has_rollups = cur.fetchone() is not None
+
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'expenses_fts';")
+        has_search_index = cur.fetchone() is not None
+
+        stats += self.CREATE_ROLLUP_TABLES
+        stats += self._rollup_triggers()
         for stat in stats:
             cur.execute(stat)
         self.conn.commit()
 
+        # Databases created before the rollups existed need one full pass
+        if not has_rollups:
+            self.rebuild_rollups()
+
+        try:
+            for stat in self.CREATE_SEARCH_INDEX:
+                cur.execute(stat)
+            if not has_search_index:
+                cur.execute("INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild');")
+            self.conn.commit()
+            self.has_search_index = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; the item filter falls back to LIKE
+            self.conn.rollback()
+
+    def _commit(self):
+        """Commit and bump the data generation so cached results are dropped."""
+        self.conn.commit()
+        self._generation += 1
+        if self.concurrent and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def _category_id_map(self) -> dict:
+        """Return the category name -> id map, reloading it if needed.
+
+        PRAGMA data_version changes whenever another connection commits, so
+        a category renamed or added by another process triggers a reload.
+        Writes through this connection keep the map up to date themselves.
+        """
+        version = self.conn.execute("PRAGMA data_version;").fetchone()[0]
+        if version != self._category_version:
+            self._category_ids = dict(self.conn.execute("SELECT category_name, id FROM category;").fetchall())
+            self._category_version = version
+        return self._category_ids
+
+    def _rollback(self):
+        """Roll back and force a reload of the category map, which may hold rolled back ids."""
+        self.conn.rollback()
+        self._category_version = None
+
+    def _cache_key_filters(self, filters: dict = None) -> tuple:
+        """Normalize a filter dict so equivalent filters share a cache entry."""
+        normalized = []
+        for key, values in sorted((filters or {}).items()):
+            if not values:
+                continue
+            if isinstance(values, (list, tuple, set)):
+                values = tuple(sorted(str(v).strip() for v in values))
+            else:
+                values = str(values)
+            normalized.append((key, values))
+        return tuple(normalized)
+
+    def _cached(self, key: tuple, compute):
+        """Return the cached result for key, computing and storing it on a miss.
+
+        Entries are tagged with this connection's write generation and with
+        SQLite's data_version, which changes when another connection commits,
+        so a cached result is never served after the data changed.
+        """
+        if not self.cache_size:
+            return compute()
+
+        tag = self.data_version
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == tag:
+                self._cache.move_to_end(key)
+                self._cache_hits += 1
+        if entry is not None and entry[0] == tag:
+            result = entry[1]
+        else:
+            result = compute()
+            with self._cache_lock:
+                self._cache_misses += 1
+                self._cache[key] = (tag, result)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        # Hand out copies of the containers (lists, dicts, DataFrames) so
+        # callers can't modify the cached results; records are immutable
+        return result.copy() if hasattr(result, 'copy') else result
+
+    @property
+    def data_version(self) -> tuple:
+        """Token that changes whenever the data changes, through any connection.
+
+        Combines this connection's write generation with SQLite's
+        data_version, so callers can cache results derived from the
+        database and check them with a single PRAGMA. Both restart when a
+        manager is opened again, so the token also carries a number unique
+        to this manager; tokens of two managers never match.
+        """
+        # data_version is per connection, so one shared connection gives
+        # every reader the same view of other commits. Checked under the
+        # lock because close() may drop it from another thread.
+        with self._monitor_lock:
+            monitor = self._monitor
+            if monitor is not None:
+                version = monitor.execute("PRAGMA data_version;").fetchone()[0]
+        if monitor is None:
+            version = self.conn.execute("PRAGMA data_version;").fetchone()[0]
+        return (self._instance_id, self._generation, version)
+
+    def clear_cache(self):
+        """Drop every cached query result."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    @property
+    def cache_stats(self) -> dict:
+        """Hit/miss counters and current size of the result cache."""
+        lookups = self._cache_hits + self._cache_misses
+        return {
+            'hits': self._cache_hits,
+            'misses': self._cache_misses,
+            'hit_rate': self._cache_hits / lookups if lookups else 0.0,
+            'size': len(self._cache),
+            'max_size': self.cache_size,
+        }
+
+    def _rollup_add_sql(self, row: str) -> list:
+        """Statements folding the expense `row` (NEW/OLD) into every rollup."""
+        stats = []
+        for table, key, key_expr in self.ROLLUP_LEVELS:
+            keys = ([key] if key else []) + ['category_id']
+            values = ([key_expr.format(row=row)] if key else []) + [f'{row}.category_id']
+            stats.append(f'''INSERT INTO {table} ({', '.join(keys)}, transaction_count, total_amount, min_amount, max_amount)
+                VALUES ({', '.join(values)}, 1, {row}.price, {row}.price, {row}.price)
+                ON CONFLICT ({', '.join(keys)}) DO UPDATE SET
+                    transaction_count = transaction_count + 1,
+                    total_amount = total_amount + excluded.total_amount,
+                    min_amount = MIN(min_amount, excluded.min_amount),
+                    max_amount = MAX(max_amount, excluded.max_amount);''')
+        return stats
+
+    def _rollup_remove_sql(self, row: str) -> list:
+        """Statements taking the expense `row` (NEW/OLD) out of every rollup.
+
+        MIN/MAX only need recomputing when the removed price was the extreme,
+        and then only from the next finer level: the day from its expense
+        rows, the month from its days and the category from its months.
+        """
+        day_match = f"date = {row}.date AND category_id = {row}.category_id"
+        month = f"substr({row}.date, 1, 7)"
+        finer = {
+            'rollup_daily': ("price", f"expenses WHERE {day_match}"),
+            'rollup_monthly': ("min_amount", f"rollup_daily WHERE date BETWEEN {month} || '-01' AND {month} || '-31' AND category_id = {row}.category_id"),
+            'rollup_category': ("min_amount", f"rollup_monthly WHERE category_id = {row}.category_id"),
+        }
+        stats = []
+        for table, key, key_expr in self.ROLLUP_LEVELS:
+            match = (f"{key} = {key_expr.format(row=row)} AND " if key else '') + f"category_id = {row}.category_id"
+            min_col, source = finer[table]
+            max_col = min_col.replace('min', 'max')
+            stats.append(f'''UPDATE {table} SET
+                    transaction_count = transaction_count - 1,
+                    total_amount = total_amount - {row}.price,
+                    min_amount = CASE WHEN {row}.price > min_amount THEN min_amount
+                        ELSE (SELECT MIN({min_col}) FROM {source}) END,
+                    max_amount = CASE WHEN {row}.price < max_amount THEN max_amount
+                        ELSE (SELECT MAX({max_col}) FROM {source}) END
+                WHERE {match};''')
+            stats.append(f"DELETE FROM {table} WHERE {match} AND transaction_count <= 0;")
+        return stats
+
+    def _rollup_triggers(self) -> list:
+        triggers = {
+            'trg_expenses_rollup_insert': ('AFTER INSERT', self._rollup_add_sql('NEW')),
+            'trg_expenses_rollup_delete': ('AFTER DELETE', self._rollup_remove_sql('OLD')),
+            'trg_expenses_rollup_update': ('AFTER UPDATE OF date, price, category_id',
+                                           self._rollup_remove_sql('OLD') + self._rollup_add_sql('NEW')),
+        }
+        return [f"CREATE TRIGGER IF NOT EXISTS {name} {event} ON expenses BEGIN\n" + "\n".join(body) + "\nEND;"
+                for name, (event, body) in triggers.items()]
+
+    @_instrumented
+    def rebuild_rollups(self):
+        """Recompute the summary rollup tables from the expenses table.
+        
+        Raises:
+            DatabaseOperationError: If database operation fails
+        """
+        aggregates = "COUNT(*), SUM(price), MIN(price), MAX(price)"
+        stats = [
+            "DELETE FROM rollup_daily;",
+            "DELETE FROM rollup_monthly;",
+            "DELETE FROM rollup_category;",
+            f"INSERT INTO rollup_daily SELECT date, category_id, {aggregates} FROM expenses GROUP BY date, category_id;",
+            f"INSERT INTO rollup_monthly SELECT substr(date, 1, 7), category_id, {aggregates} FROM expenses GROUP BY substr(date, 1, 7), category_id;",
+            f"INSERT INTO rollup_category SELECT category_id, {aggregates} FROM expenses GROUP BY category_id;",
+        ]
+        try:
+            cur = self.conn.cursor()
+            for stat in stats:
+                cur.execute(stat)
+            self._commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise self.DatabaseOperationError(f"Failed to rebuild rollups: {e}")
+
+    @_instrumented
     def add(self, date: str, item: str, price: int, cat: str) -> bool:
         """Add a new expense record to the database.
         
@@ -91,7 +525,46 @@ class ExpenseManager:
             InvalidInputError: If input validation fails
             DatabaseOperationError: If database operation fails
         """
-        # Input validation
+        date, item, price, normalized_cat = self._validate_expense(date, item, price, cat)
+
+        try:
+            cur = self.conn.cursor()
+            
+            # Add category if not exists; known categories come from the map
+            category_ids = self._category_id_map()
+            cat_id = category_ids.get(normalized_cat)
+            if cat_id is None:
+                cur.execute("INSERT OR IGNORE INTO category (category_name) VALUES (?);", (normalized_cat,))
+                cur.execute("SELECT id FROM category WHERE category_name = ?;", (normalized_cat,))
+                cat_id = cur.fetchone()
+                
+                if not cat_id:
+                    raise self.DatabaseOperationError("Failed to get or create category")
+                
+                cat_id = cat_id[0]
+                category_ids[normalized_cat] = cat_id
+
+            # Add expense
+            cur.execute(
+                "INSERT INTO expenses (date, item, price, category_id) VALUES (?,?,?,?);",
+                (date, item, price, cat_id)
+            )
+            self._commit()
+            return True
+            
+        except sqlite3.Error as e:
+            self._rollback()
+            raise self.DatabaseOperationError(f"Failed to add expense: {e}")
+
+    def _validate_expense(self, date: str, item: str, price: int, cat: str) -> tuple:
+        """Validate a single expense and return it normalized.
+
+        Returns:
+            tuple: (date as YYYY-MM-DD, item, price, stripped category name)
+
+        Raises:
+            InvalidInputError: If input validation fails
+        """
         if not all([date, item, cat]):
             raise self.InvalidInputError("Date, item, and category cannot be empty")
         if price < 0:
@@ -102,39 +575,301 @@ class ExpenseManager:
         except ValueError as e:
             raise self.InvalidInputError(f"Invalid date format. Use YYYY-MM-DD: {e}")
 
+        # Normalize category name by removing leading/trailing whitespace
+        return date_obj.strftime("%Y-%m-%d"), item, price, cat.strip()
+
+    @_instrumented
+    def add_many(self, entries) -> tuple:
+        """Add a batch of expense records in a single transaction.
+        
+        Every entry is validated first; invalid entries are reported and
+        skipped while the valid ones are inserted together with one commit.
+        
+        Args:
+            entries: Iterable of (date, item, price, category) tuples
+            
+        Returns:
+            tuple: (list of indexes of the added entries,
+                list of (index, error message) for the rejected entries)
+            
+        Raises:
+            DatabaseOperationError: If the batch insert fails; nothing is added
+        """
+        rows = []
+        errors = []
+        for index, entry in enumerate(entries):
+            try:
+                rows.append((index,) + self._validate_expense(*entry))
+            except self.InvalidInputError as e:
+                errors.append((index, str(e)))
+            except (TypeError, ValueError) as e:
+                errors.append((index, f"Invalid entry: {e}"))
+
+        if not rows:
+            return [], errors
+
         try:
             cur = self.conn.cursor()
             
-            # Normalize category name by removing leading/trailing whitespace
-            normalized_cat = cat.strip()
+            # Resolve every category of the batch at once; only unknown ones hit the database
+            cat_ids = self._category_id_map()
+            categories = sorted({row[4] for row in rows} - cat_ids.keys())
+            cur.executemany("INSERT OR IGNORE INTO category (category_name) VALUES (?);",
+                            [(cat,) for cat in categories])
+            for i in range(0, len(categories), 500):
+                chunk = categories[i:i + 500]
+                placeholders = ','.join('?' for _ in chunk)
+                cur.execute(f"SELECT category_name, id FROM category WHERE category_name IN ({placeholders});", chunk)
+                cat_ids.update(cur.fetchall())
             
-            # Add category if not exists
-            cur.execute("INSERT OR IGNORE INTO category (category_name) VALUES (?);", (normalized_cat,))
-            cur.execute("SELECT id FROM category WHERE category_name = ?;", (normalized_cat,))
-            cat_id = cur.fetchone()
-            
-            if not cat_id:
+            if any(row[4] not in cat_ids for row in rows):
                 raise self.DatabaseOperationError("Failed to get or create category")
-            
-            cat_id = cat_id[0]
 
-            # Add expense
-            cur.execute(
+            cur.executemany(
                 "INSERT INTO expenses (date, item, price, category_id) VALUES (?,?,?,?);",
-                (date_obj.strftime("%Y-%m-%d"), item, price, cat_id)
+                [(date, item, price, cat_ids[cat]) for _, date, item, price, cat in rows]
             )
-            self.conn.commit()
-            return True
+            self._commit()
+            return [row[0] for row in rows], errors
             
         except sqlite3.Error as e:
-            self.conn.rollback()
-            raise self.DatabaseOperationError(f"Failed to add expense: {e}")
+            self._rollback()
+            raise self.DatabaseOperationError(f"Failed to add expenses: {e}")
+        except self.DatabaseOperationError:
+            self._rollback()
+            raise
+
+    def _build_filters(self, filters: dict = None, date_column: str = 'expenses.date'):
+        """Translate a fetch() filter dict into WHERE clauses and parameters.
+
+        Year/month/day selections are turned into date ranges so that
+        SQLite can answer them from idx_expenses_date instead of scanning
+        the whole table through strftime(). date_column lets the date
+        conditions run against a rollup table instead.
+
+        Returns:
+            tuple: (list of SQL clauses to AND together, list of parameters)
+        """
+        where_clauses = []
+        params = []
+        if not filters:
+            return where_clauses, params
+
+        allowed_keys = ['id', 'year', 'month', 'day', 'item', 'price', 'category_name', 'date_from', 'date_to']
+        filters = {key: values for key, values in filters.items() if key in allowed_keys and values}
+
+        if any(key in filters for key in ['year', 'month', 'day']):
+            ranges = self._date_ranges(filters.get('year'), filters.get('month'), filters.get('day'))
+            if ranges:
+                query = [f"({date_column} >= ? AND {date_column} < ?)" for _ in ranges]
+                where_clauses.append('(' + ' OR '.join(query) + ')')
+                for start, end in ranges:
+                    params.extend([start, end])
+            else:
+                # None of the requested year/month/day combinations exist
+                where_clauses.append('0')
+
+        if 'date_from' in filters:
+            where_clauses.append(f"{date_column} >= ?")
+            params.append(self._normalize_date(filters['date_from']))
+        if 'date_to' in filters:
+            where_clauses.append(f"{date_column} <= ?")
+            params.append(self._normalize_date(filters['date_to']))
+
+        if 'category_name' in filters:
+            normalized_values = [v.strip() for v in filters['category_name']]
+            query = ["category_name = ?" for _ in normalized_values]
+            where_clauses.append('(' + ' OR '.join(query) + ')')
+            params.extend(normalized_values)
+
+        if 'price' in filters:
+            clause, price_params = self._price_filter(filters['price'])
+            where_clauses.append(clause)
+            params.extend(price_params)
+
+        if 'item' in filters:
+            clause, item_params = self._item_filter(filters['item'])
+            where_clauses.append(clause)
+            params.extend(item_params)
+
+        if 'id' in filters:
+            placeholders = ','.join('?' for _ in filters['id'])
+            where_clauses.append(f"expenses.id IN ({placeholders})")
+            params.extend(filters['id'])
+
+        return where_clauses, params
+
+    def _price_filter(self, values) -> tuple:
+        """Build the clause for a price filter; returns (clause, params).
 
-    def fetch(self, filters:dict = None, orderby='id', desc=False, limit=None, offset=None) -> pd.DataFrame:
+        Each value is an exact price ('50000'), a range ('50000..200000'),
+        a minimum ('50000..') or a maximum ('..200000'); bounds are
+        inclusive and may use '.' or ',' as thousands separators. Rows
+        matching any of the values are returned.
+
+        Raises:
+            InvalidInputError: If a value is not a price or a range
+        """
+        if isinstance(values, (str, int)):
+            values = [values]
+        clauses = []
+        params = []
+        for value in values:
+            low, sep, high = str(value).strip().partition('..')
+            try:
+                low = int(low.replace('.', '').replace(',', '')) if low.strip() else None
+                high = int(high.replace('.', '').replace(',', '')) if high.strip() else None
+            except ValueError:
+                raise self.InvalidInputError(f"Invalid price filter '{value}'. Use 50000, 50000..200000, 50000.. or ..200000")
+            if not sep:
+                clauses.append("expenses.price = ?")
+                params.append(low)
+            elif low is not None and high is not None:
+                clauses.append("expenses.price BETWEEN ? AND ?")
+                params.extend([low, high])
+            elif low is not None:
+                clauses.append("expenses.price >= ?")
+                params.append(low)
+            elif high is not None:
+                clauses.append("expenses.price <= ?")
+                params.append(high)
+            else:
+                raise self.InvalidInputError(f"Invalid price filter '{value}'. Use 50000, 50000..200000, 50000.. or ..200000")
+        return '(' + ' OR '.join(clauses) + ')', params
+
+    def _item_filter(self, values) -> tuple:
+        """Build the clause for an item search; returns (clause, params).
+
+        Each value is a query of whitespace-separated terms that must all
+        occur in the item name; a term ending in '*' matches as a prefix
+        (e.g. 'kop*'). Rows matching any of the values are returned. The
+        search runs on the FTS5 index when SQLite has FTS5, and on a LIKE
+        scan otherwise.
+        """
+        if isinstance(values, str):
+            values = [values]
+        queries = []
+        for value in values:
+            terms = [(term.rstrip('*'), term.endswith('*')) for term in str(value).split()]
+            terms = [(term, prefix) for term, prefix in terms if term]
+            if terms:
+                queries.append(terms)
+        if not queries:
+            return '0', []
+
+        if not self.has_search_index:
+            clauses = []
+            params = []
+            for terms in queries:
+                clauses.append('(' + ' AND '.join("item LIKE ?" for _ in terms) + ')')
+                params.extend(f"%{term}%" for term, _ in terms)
+            return '(' + ' OR '.join(clauses) + ')', params
+
+        # Quote every term so FTS5 operators in user input are taken literally
+        match = ' OR '.join(
+            '(' + ' AND '.join('"' + term.replace('"', '""') + '"' + ('*' if prefix else '') for term, prefix in terms) + ')'
+            for terms in queries
+        )
+        return "expenses.id IN (SELECT rowid FROM expenses_fts WHERE expenses_fts MATCH ?)", [match]
+
+    def _normalize_date(self, value) -> str:
+        """Validate a YYYY-MM-DD string and return it zero-padded."""
+        try:
+            return datetime.strptime(str(value), "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError as e:
+            raise self.InvalidInputError(f"Invalid date format. Use YYYY-MM-DD: {e}")
+
+    def _date_ranges(self, years=None, months=None, days=None) -> list:
+        """Expand year/month/day filter values into merged [start, end) date ranges.
+
+        Values follow the old strftime() semantics: years must be four
+        digits, months and days are zero-padded to two. Combinations that do
+        not form a real date (e.g. day 31 in February) match nothing. When
+        no year is given, the years spanned by the table are used.
+        """
+        def parse(values, width, upper, pad=True):
+            parsed = set()
+            for value in values or []:
+                value = str(value).zfill(width) if pad else str(value)
+                if len(value) == width and value.isdigit() and 1 <= int(value) <= upper:
+                    parsed.add(int(value))
+            return sorted(parsed)
+
+        year_list = parse(years, 4, 9998, pad=False)
+        month_list = parse(months, 2, 12)
+        day_list = parse(days, 2, 31)
+
+        if (years and not year_list) or (months and not month_list) or (days and not day_list):
+            return []
+
+        if not years:
+            with self._reading() as conn:
+                first, last = conn.execute("SELECT MIN(date), MAX(date) FROM expenses;").fetchone()
+            if first is None:
+                return []
+            year_list = range(int(first[:4]), int(last[:4]) + 1)
+
+        ranges = []
+        for y in year_list:
+            if not month_list and not day_list:
+                ranges.append((datetime(y, 1, 1), datetime(y + 1, 1, 1)))
+                continue
+            for m in month_list or range(1, 13):
+                month_start = datetime(y, m, 1)
+                next_month = datetime(y + 1, 1, 1) if m == 12 else datetime(y, m + 1, 1)
+                if not day_list:
+                    ranges.append((month_start, next_month))
+                    continue
+                for d in day_list:
+                    try:
+                        day = datetime(y, m, d)
+                    except ValueError:
+                        continue
+                    ranges.append((day, day + timedelta(days=1)))
+
+        # Merge adjacent ranges so e.g. a full list of months becomes one range
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")) for start, end in merged]
+
+    def _period_range(self, period: str):
+        """Return the [start, end) date range covered by a summary period.
+
+        Returns None for 'all'. 'this_week' mirrors strftime('%Y-%W'): weeks
+        start on Monday and are cut off at the year boundary.
+        """
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if period == 'today':
+            start, end = today, today + timedelta(days=1)
+        elif period == 'this_week':
+            start = today - timedelta(days=today.weekday())
+            end = start + timedelta(days=7)
+            start = max(start, today.replace(month=1, day=1))
+            end = min(end, today.replace(year=today.year + 1, month=1, day=1))
+        elif period == 'this_month':
+            start = today.replace(day=1)
+            end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+        elif period == 'this_year':
+            start = today.replace(month=1, day=1)
+            end = start.replace(year=start.year + 1)
+        else:
+            return None
+        return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+    @_instrumented
+    def fetch(self, filters:dict = None, orderby='id', desc=False, limit=None, offset=None) -> 'pd.DataFrame':
         """Fetch expense records from the database.
         
         Args:
-            filters: Dictionary of filter conditions
+            filters: Dictionary of filter conditions. Besides the list-valued
+                keys, 'date_from' and 'date_to' accept a single inclusive
+                YYYY-MM-DD bound. 'item' takes full-text queries, e.g.
+                ['kopi susu', 'teh*'] (see _item_filter()), 'price' exact
+                prices and ranges, e.g. ['50000..200000'] (see _price_filter()).
             orderby: Column name to order by
             desc: Boolean indicating descending order
             limit : Maximum number of records to fetch
@@ -146,53 +881,204 @@ class ExpenseManager:
         allowed_orderby = ['id', 'date', 'item', 'price', 'category_name']
         if orderby not in allowed_orderby:
             orderby = 'id'
-            
+
+        key = ('fetch', self._cache_key_filters(filters), orderby, bool(desc), int(limit or 0), int(offset or 0))
+        return self._cached(key, lambda: self._fetch(filters, orderby, desc, limit, offset))
+
+    def _select_sql(self, filters, orderby, desc, limit, offset) -> tuple:
+        """Build the SELECT used by fetch() and iter_rows(); returns (stat, params)."""
         stat = "SELECT expenses.id id, date, item, price, category_name FROM expenses JOIN category ON expenses.category_id = category.id"
-        params = []
-        if filters:
-            allowed_keys = ['id', 'year', 'month', 'day', 'item', 'price', 'category_name']
-            where_clauses = []
-            for key, values in filters.items():
-                if key in allowed_keys and values:
-                    if key == 'year':
-                        query = ["strftime('%Y', date) = ?" for _ in values]
-                        where_clauses.append('(' + ' OR '.join(query) + ')')
-                        params.extend(values)
-                    elif key == 'month':
-                        query = ["strftime('%m', date) = ?" for _ in values]
-                        where_clauses.append('(' + ' OR '.join(query) + ')')
-                        values = [x.zfill(2) for x in values]
-                        params.extend(values)
-                    elif key == 'day':
-                        query = ["strftime('%d', date) = ?" for _ in values]
-                        where_clauses.append('(' + ' OR '.join(query) + ')')
-                        values = [x.zfill(2) for x in values]
-                        params.extend(values)
-                    elif key == 'category_name':
-                        normalized_values = [v.strip() for v in values]
-                        query = [f"{key} = ?" for _ in normalized_values]
-                        where_clauses.append('(' + ' OR '.join(query) + ')')
-                        params.extend(normalized_values)
-                    elif key == 'id':
-                        query = [f"expenses.{key} = ?" for _ in values]
-                        where_clauses.append('(' + ' OR '.join(query) + ')')
-                        params.extend(values)
-                
-            if where_clauses:
-                stat += ' WHERE ' + ' AND '.join(where_clauses)
+        where_clauses, params = self._build_filters(filters)
+        if where_clauses:
+            stat += ' WHERE ' + ' AND '.join(where_clauses)
 
         stat += f' ORDER BY {orderby} {"DESC" if desc else "ASC"}'
 
         if limit:
             stat += f' LIMIT {int(limit)}'
         if offset:
-            stat += f' OFFSET {int(offset)}'
+            # SQLite only accepts OFFSET after a LIMIT; -1 means no limit
+            stat += f'{"" if limit else " LIMIT -1"} OFFSET {int(offset)}'
 
         stat += ';'
+        return stat, params
 
-        df = pd.read_sql_query(stat, self.conn, params=params)
+    def _fetch(self, filters, orderby, desc, limit, offset) -> 'pd.DataFrame':
+        stat, params = self._select_sql(filters, orderby, desc, limit, offset)
+        import pandas as pd
+        with self._reading() as conn:
+            df = pd.read_sql_query(stat, conn, params=params)
         return df
-    
+
+    @_instrumented
+    def iter_rows(self, filters: dict = None, orderby='id', desc=False, limit=None, offset=None):
+        """Stream expense records from a cursor without building a DataFrame.
+        
+        Takes the same arguments as fetch(). Rows are read from SQLite as
+        the generator is consumed, so memory use does not depend on the
+        size of the result.
+        
+        Yields:
+            ExpenseRecord for each matching row
+        """
+        allowed_orderby = ['id', 'date', 'item', 'price', 'category_name']
+        if orderby not in allowed_orderby:
+            orderby = 'id'
+
+        stat, params = self._select_sql(filters, orderby, desc, limit, offset)
+        with self._reading() as conn:
+            cur = conn.cursor()
+            cur.row_factory = _record_factory
+            try:
+                cur.execute(stat, params)
+                while True:
+                    rows = cur.fetchmany(500)
+                    if not rows:
+                        break
+                    yield from rows
+            except sqlite3.Error as e:
+                raise self.DatabaseOperationError(f"Failed to fetch expenses: {e}")
+            finally:
+                cur.close()
+
+    @_instrumented
+    def fetch_rows(self, filters: dict = None, orderby='id', desc=False, limit=None, offset=None) -> list:
+        """Like fetch(), but return a list of ExpenseRecord instead of a DataFrame."""
+        allowed_orderby = ['id', 'date', 'item', 'price', 'category_name']
+        if orderby not in allowed_orderby:
+            orderby = 'id'
+
+        key = ('fetch_rows', self._cache_key_filters(filters), orderby, bool(desc), int(limit or 0), int(offset or 0))
+        return self._cached(key, lambda: list(self.iter_rows(filters, orderby, desc, limit, offset)))
+
+    @_instrumented
+    def count(self, filters: dict = None) -> int:
+        """Return the number of expense records matching filters.
+
+        Filters on year/month/day, date_from/date_to and category_name only
+        are answered from rollup_daily, so the cost depends on the number
+        of days in the range rather than on the number of rows. Other
+        filters count the matching rows, joining the category table only
+        when a category is filtered on.
+
+        Args:
+            filters: Dictionary of filter conditions, as accepted by fetch()
+        """
+        key = ('count', self._cache_key_filters(filters))
+        return self._cached(key, lambda: self._count(filters))
+
+    def _count(self, filters) -> int:
+        filters = {key: values for key, values in (filters or {}).items() if values}
+        source, params, aggregates = self._aggregate_source(filters, join_category='category_name' in filters)
+        stat = f"SELECT COALESCE({aggregates['count']}, 0){source};"
+        with self._reading() as conn:
+            try:
+                return conn.execute(stat, params).fetchone()[0]
+            except sqlite3.Error as e:
+                raise self.DatabaseOperationError(f"Failed to count expenses: {e}")
+
+    def _aggregate_source(self, filters: dict, join_category: bool) -> tuple:
+        """Pick the cheapest rows to aggregate for filters.
+
+        Returns:
+            tuple: (' FROM ... WHERE ...' SQL, parameters, dict mapping
+                'count', 'total', 'min' and 'max' to aggregate expressions)
+        """
+        if set(filters) <= self.ROLLUP_FILTERS:
+            where_clauses, params = self._build_filters(filters, date_column='r.date')
+            source = " FROM rollup_daily r"
+            category_id = 'r.category_id'
+            aggregates = {'count': 'SUM(r.transaction_count)', 'total': 'SUM(r.total_amount)',
+                          'min': 'MIN(r.min_amount)', 'max': 'MAX(r.max_amount)'}
+        else:
+            where_clauses, params = self._build_filters(filters)
+            source = " FROM expenses"
+            category_id = 'expenses.category_id'
+            aggregates = {'count': 'COUNT(*)', 'total': 'SUM(expenses.price)',
+                          'min': 'MIN(expenses.price)', 'max': 'MAX(expenses.price)'}
+        if join_category:
+            source += f" JOIN category ON {category_id} = category.id"
+        if where_clauses:
+            source += ' WHERE ' + ' AND '.join(where_clauses)
+        return source, params, aggregates
+
+    @_instrumented
+    def fetch_page(self, filters: dict = None, orderby='date', desc=True, limit=5, after=None, before=None, last=False,
+                   as_rows=False, count=True) -> tuple:
+        """Fetch one page of expense records using keyset (seek) pagination.
+
+        Rows are ordered by (orderby, id), so a page is located by the key of
+        a neighbouring row instead of an OFFSET, and the cost of a page does
+        not grow with its position in the result.
+
+        Args:
+            filters: Dictionary of filter conditions, as accepted by fetch()
+            orderby: Column name to order by
+            desc: Boolean indicating descending order
+            limit: Page size
+            after: (sort value, id) key; return the rows that follow it
+            before: (sort value, id) key; return the rows that precede it
+            last: Return the final `limit` rows of the result
+            as_rows: Return a list of ExpenseRecord instead of a DataFrame
+            count: Also return the total, see count(); pass False when the
+                caller already knows it
+
+        Returns:
+            tuple: (DataFrame (or list of ExpenseRecord) with the page rows in
+                the requested order, total number of rows matching the
+                filters or None if count is False)
+        """
+        allowed_orderby = ['id', 'date', 'item', 'price', 'category_name']
+        if orderby not in allowed_orderby:
+            orderby = 'id'
+        if after is not None and before is not None:
+            raise self.InvalidInputError("Use either 'after' or 'before', not both")
+
+        key = ('fetch_page', self._cache_key_filters(filters), orderby, bool(desc), int(limit),
+               tuple(after) if after is not None else None,
+               tuple(before) if before is not None else None, bool(last), bool(as_rows))
+        page = self._cached(key, lambda: self._fetch_page(filters, orderby, desc, limit, after, before, last, as_rows))
+        return page, (self.count(filters) if count else None)
+
+    def _fetch_page(self, filters, orderby, desc, limit, after, before, last, as_rows) -> tuple:
+        sort_col = 'expenses.id' if orderby == 'id' else orderby
+        where_clauses, params = self._build_filters(filters)
+        from_clause = " FROM expenses JOIN category ON expenses.category_id = category.id"
+
+        # Walk backwards for 'before'/'last' and flip the rows afterwards
+        reverse = before is not None or last
+        ascending = desc == reverse
+        page_clauses = list(where_clauses)
+        page_params = list(params)
+        key = after if after is not None else before
+        if key is not None:
+            page_clauses.append(f"({sort_col}, expenses.id) {'>' if ascending else '<'} (?, ?)")
+            page_params.extend(key)
+
+        direction = "ASC" if ascending else "DESC"
+        stat = "SELECT expenses.id id, date, item, price, category_name" + from_clause
+        if page_clauses:
+            stat += ' WHERE ' + ' AND '.join(page_clauses)
+        stat += f" ORDER BY {sort_col} {direction}, expenses.id {direction} LIMIT {int(limit)};"
+
+        with self._reading() as conn:
+            if as_rows:
+                cur = conn.cursor()
+                cur.row_factory = _record_factory
+                try:
+                    cur.execute(stat, page_params)
+                except sqlite3.Error as e:
+                    raise self.DatabaseOperationError(f"Failed to fetch expenses: {e}")
+                rows = cur.fetchall()
+                return rows[::-1] if reverse else rows
+            import pandas as pd
+            df = pd.read_sql_query(stat, conn, params=page_params)
+
+        if reverse:
+            df = df.iloc[::-1].reset_index(drop=True)
+        return df
+
+    @_instrumented
     def update_category_name(self, old_name: str, new_name: str) -> bool:
         """Update an existing category name.
         
@@ -224,20 +1110,24 @@ class ExpenseManager:
             cur = self.conn.cursor()
             cur.execute("UPDATE category SET category_name = ? WHERE category_name = ?", 
                        (normalized_new_name, normalized_old_name))
-            self.conn.commit()
+            self._commit()
             
             if cur.rowcount == 0:
                 raise self.InvalidInputError(f"Category '{old_name}' not found")
                 
+            category_ids = self._category_id_map()
+            if normalized_old_name in category_ids:
+                category_ids[normalized_new_name] = category_ids.pop(normalized_old_name)
             return True
             
         except sqlite3.IntegrityError:
-            self.conn.rollback()
+            self._rollback()
             raise self.InvalidInputError(f"Category '{new_name}' already exists")
         except sqlite3.Error as e:
-            self.conn.rollback()
+            self._rollback()
             raise self.DatabaseOperationError(f"Failed to update category: {e}")
 
+    @_instrumented
     def delete_data(self, id: int) -> bool:
         """Delete an expense record by its ID.
         
@@ -257,7 +1147,7 @@ class ExpenseManager:
         try:
             cur = self.conn.cursor()
             cur.execute("DELETE FROM expenses WHERE id = ?;", (id,))
-            self.conn.commit()
+            self._commit()
             
             if cur.rowcount == 0:
                 raise self.InvalidInputError(f"Expense with ID {id} not found")
@@ -268,14 +1158,67 @@ class ExpenseManager:
             self.conn.rollback()
             raise self.DatabaseOperationError(f"Failed to delete expense: {e}")
         
+    @_instrumented
+    def delete_many(self, ids) -> tuple:
+        """Delete several expense records in a single transaction.
+        
+        Args:
+            ids: Iterable of expense record IDs
+            
+        Returns:
+            tuple: (sorted list of deleted IDs, sorted list of IDs that were not found)
+            
+        Raises:
+            InvalidInputError: If any ID is invalid
+            DatabaseOperationError: If database operation fails; nothing is deleted
+        """
+        # Validate before deduplicating: set() and sorted() fail on mixed or unhashable values
+        ids = list(ids)
+        if not all(isinstance(id, int) and id > 0 for id in ids):
+            raise self.InvalidInputError("Invalid expense ID")
+        ids = sorted(set(ids))
+
+        deleted = []
+        try:
+            cur = self.conn.cursor()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                placeholders = ','.join('?' for _ in chunk)
+                cur.execute(f"SELECT id FROM expenses WHERE id IN ({placeholders});", chunk)
+                deleted.extend(row[0] for row in cur.fetchall())
+                cur.execute(f"DELETE FROM expenses WHERE id IN ({placeholders});", chunk)
+            self._commit()
+            
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            raise self.DatabaseOperationError(f"Failed to delete expenses: {e}")
+
+        deleted.sort()
+        found = set(deleted)
+        return deleted, [id for id in ids if id not in found]
+
     def close(self):
         """Close the database connection."""
+        self._closed = True
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        with self._monitor_lock:
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
         self.conn.close()
+        if self.stats is not None:
+            self.stats.flush()
     
-    def fetch_summary(self, group_by: str = 'category', period: str = 'this_month') -> pd.DataFrame:
+    @_instrumented
+    def fetch_summary(self, group_by: str = 'category', period: str = 'this_month') -> 'pd.DataFrame':
         """
         Fetch expense summary, grouped by a specified column and filtered by a time period.
         
+        The statistics are read from the trigger-maintained rollup tables, so
+        the cost depends on the number of groups rather than on the number of
+        expense rows.
+        
         Args:
             group_by (str): Column to group by. Allowed: 'category', 'year', 'month', 'day'.
             period (str): Time period to filters by. Allowed: 'all', 'today', 'this_week', 'this_month', 'this_year'.
@@ -296,39 +1239,47 @@ class ExpenseManager:
         if period not in allowed_periods:
             raise self.InvalidInputError(f"Invalid period value. Allowed: {allowed_periods}")
 
-        # 2. Determine grouping expression from validated input
+        date_range = self._period_range(period)
+        key = ('fetch_summary', group_by, date_range)
+        return self._cached(key, lambda: self._fetch_summary(group_by, date_range))
+
+    def _fetch_summary(self, group_by: str, date_range) -> 'pd.DataFrame':
+        # 2. Pick the coarsest rollup that can answer the query. Periods are
+        #    whole days, so only 'all' can use the monthly/category levels.
+        if date_range is None and group_by == 'category':
+            source, key = 'rollup_category', None
+        elif date_range is None and group_by in ('year', 'month'):
+            source, key = 'rollup_monthly', 'month'
+        else:
+            source, key = 'rollup_daily', 'date'
+
         group_expression_map = {
             'category': 'category_name',
-            'year': "strftime('%Y', date)",
-            'month': "strftime('%Y-%m', date)",
-            'day': 'date'
+            'year': f"substr({key}, 1, 4)",
+            'month': f"substr({key}, 1, 7)",
+            'day': key
         }
         group_col_expression = group_expression_map[group_by]
 
-        # 3. Determine WHERE clause for the time period
+        # 3. Determine WHERE clause for the time period as an indexable date range
         where_clause = ""
-        if period == 'today':
-            where_clause = "WHERE date = date('now', 'localtime')"
-        elif period == 'this_week':
-            # SQLite's week starts on Sunday. This captures the current week.
-            where_clause = "WHERE strftime('%Y-%W', date) = strftime('%Y-%W', 'now', 'localtime')"
-        elif period == 'this_month':
-            where_clause = "WHERE strftime('%Y-%m', date) = strftime('%Y-%m', 'now', 'localtime')"
-        elif period == 'this_year':
-            where_clause = "WHERE strftime('%Y', date) = strftime('%Y', 'now', 'localtime')"
+        params = []
+        if date_range:
+            where_clause = "WHERE r.date >= ? AND r.date < ?"
+            params.extend(date_range)
         # For 'all', where_clause remains empty, fetching all data.
 
         # 4. Construct the final, safe query
         query = f"""
             SELECT
                 {group_col_expression} as summary_group,
-                COUNT(*) as transaction_count,
-                SUM(price) as total_amount,
-                ROUND(AVG(price)) as average_amount,
-                MIN(price) as min_amount,
-                MAX(price) as max_amount
-            FROM expenses
-            JOIN category ON expenses.category_id = category.id
+                SUM(transaction_count) as transaction_count,
+                SUM(total_amount) as total_amount,
+                ROUND(SUM(total_amount) * 1.0 / SUM(transaction_count)) as average_amount,
+                MIN(min_amount) as min_amount,
+                MAX(max_amount) as max_amount
+            FROM {source} r
+            JOIN category ON r.category_id = category.id
             {where_clause}
             GROUP BY 
             summary_group
@@ -336,17 +1287,69 @@ class ExpenseManager:
         """
 
         # 5. Execute the query
+        import pandas as pd
         try:
-            return pd.read_sql_query(query, self.conn)
+            with self._reading() as conn:
+                return pd.read_sql_query(query, conn, params=params)
         except sqlite3.Error as e:
             raise self.DatabaseOperationError(f"Failed to fetch summary: {e}")
     
+    @_instrumented
+    def fetch_filtered_summary(self, filters: dict = None) -> dict:
+        """Summarize the expenses matching filters, overall and per category.
+
+        Accepts the same filters as fetch(). Filters on days and categories
+        only are answered from rollup_daily; others aggregate the matching
+        rows in SQLite. No detail rows are loaded either way.
+
+        Args:
+            filters: Dictionary of filter conditions, as accepted by fetch()
+
+        Returns:
+            dict: 'count', 'total', 'average', 'min' and 'max' over all
+                matching expenses ('average', 'min' and 'max' are None when
+                nothing matches), and 'categories', a tuple of
+                (category_name, count, total, average) tuples ordered by name
+
+        Raises:
+            DatabaseOperationError: If the database query fails
+        """
+        key = ('fetch_filtered_summary', self._cache_key_filters(filters))
+        return self._cached(key, lambda: self._fetch_filtered_summary(filters))
+
+    def _fetch_filtered_summary(self, filters) -> dict:
+        filters = {key: values for key, values in (filters or {}).items() if values}
+        source, params, aggregates = self._aggregate_source(filters, join_category=True)
+        query = (f"SELECT category_name, {aggregates['count']}, {aggregates['total']}, "
+                 f"{aggregates['min']}, {aggregates['max']}{source} "
+                 f"GROUP BY category.id HAVING {aggregates['count']} > 0 ORDER BY category_name;")
+        try:
+            with self._reading() as conn:
+                groups = conn.execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            raise self.DatabaseOperationError(f"Failed to fetch summary: {e}")
+
+        count = sum(group[1] for group in groups)
+        total = sum(group[2] or 0 for group in groups)
+        mins = [group[3] for group in groups if group[3] is not None]
+        maxes = [group[4] for group in groups if group[4] is not None]
+        return {
+            'count': count,
+            'total': total,
+            'average': total / count if count else None,
+            'min': min(mins) if mins else None,
+            'max': max(maxes) if maxes else None,
+            'categories': tuple((name, n, amount or 0, (amount or 0) / n) for name, n, amount, _, _ in groups),
+        }
+
     @property
+    @_instrumented
     def last_date(self):
         stat = "select date from expenses order by date desc limit 1;"
-        cur = self.conn.cursor()
-        cur.execute(stat)
-        row = cur.fetchone()
+        with self._reading() as conn:
+            cur = conn.cursor()
+            cur.execute(stat)
+            row = cur.fetchone()
         if not row:
             return None
         result = row[0]
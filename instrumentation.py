@@ -0,0 +1,455 @@
+"""Opt-in query instrumentation for ExpenseManager.
+
+A QueryStats object passed to ExpenseManager(stats=...) records the wall
+time of every public method call and, through an instrumented sqlite3
+connection, the SQL text, parameter shape, rows returned and wall time of
+every statement those methods issue. Statements slower than a threshold
+are written to a rotating log together with their EXPLAIN QUERY PLAN.
+
+Aggregates are kept in memory for the running process and, when a stats
+file is configured, merged into that file from time to time so that
+`cli.py stats` can show the numbers collected by every process.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Distinct statements tracked before the rest are counted under OTHER_SQL
+MAX_STATEMENTS = 500
+OTHER_SQL = '(other statements)'
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)."""
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        index = 0
+        while index < len(BUCKETS_MS) and ms > BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (max for the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS_MS[index], self.max) if index < len(BUCKETS_MS) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {'counts': self.counts, 'count': self.count, 'total': self.total, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'LatencyHistogram':
+        histogram = cls()
+        if len(data['counts']) == len(histogram.counts):
+            histogram.counts = list(data['counts'])
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.max = data['max']
+        return histogram
+
+class StatsSnapshot:
+    """Per-method and per-statement aggregates that can be merged and saved."""
+
+    def __init__(self):
+        self.methods = {}
+        # (method, sql) -> [LatencyHistogram, rows, last parameter shape]
+        self.statements = {}
+        self.slow_queries = 0
+
+    def observe_method(self, method: str, ms: float):
+        self.methods.setdefault(method, LatencyHistogram()).observe(ms)
+
+    def observe_statement(self, method: str, sql: str, shape: str, rows: int, ms: float):
+        key = (method, sql)
+        entry = self.statements.get(key)
+        if entry is None:
+            if len(self.statements) >= MAX_STATEMENTS:
+                key = (method, OTHER_SQL)
+                entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = [LatencyHistogram(), 0, shape]
+        entry[0].observe(ms)
+        entry[1] += rows
+        entry[2] = shape
+
+    def merge(self, other: 'StatsSnapshot'):
+        for method, histogram in other.methods.items():
+            self.methods.setdefault(method, LatencyHistogram()).merge(histogram)
+        for key, (histogram, rows, shape) in other.statements.items():
+            entry = self.statements.setdefault(key, [LatencyHistogram(), 0, shape])
+            entry[0].merge(histogram)
+            entry[1] += rows
+            entry[2] = shape
+        self.slow_queries += other.slow_queries
+
+    def to_dict(self) -> dict:
+        return {
+            'methods': {method: histogram.to_dict() for method, histogram in self.methods.items()},
+            'statements': [
+                {'method': method, 'sql': sql, 'histogram': histogram.to_dict(), 'rows': rows, 'params': shape}
+                for (method, sql), (histogram, rows, shape) in self.statements.items()
+            ],
+            'slow_queries': self.slow_queries,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'StatsSnapshot':
+        snapshot = cls()
+        snapshot.methods = {method: LatencyHistogram.from_dict(h) for method, h in data.get('methods', {}).items()}
+        for entry in data.get('statements', []):
+            snapshot.statements[(entry['method'], entry['sql'])] = [
+                LatencyHistogram.from_dict(entry['histogram']), entry['rows'], entry['params']]
+        snapshot.slow_queries = data.get('slow_queries', 0)
+        return snapshot
+
+    @classmethod
+    def load(cls, path: str) -> 'StatsSnapshot':
+        """Read a stats file; a missing file gives an empty snapshot."""
+        try:
+            with open(path, encoding='utf-8') as fh:
+                return cls.from_dict(json.load(fh))
+        except FileNotFoundError:
+            return cls()
+
+    def report(self, top: int = 10) -> str:
+        """Plain-text table of the method latencies and the slowest statements."""
+        lines = [f"{'method':<22}{'calls':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for method, h in sorted(self.methods.items(), key=lambda kv: kv[1].total, reverse=True):
+            lines.append(f"{method:<22}{h.count:>8}{h.mean:>9.2f}{h.quantile(0.5):>9.1f}"
+                         f"{h.quantile(0.95):>9.1f}{h.quantile(0.99):>9.1f}{h.max:>9.1f}")
+        if not self.methods:
+            lines.append("(no calls recorded)")
+
+        lines.append("")
+        lines.append(f"Top {top} statements by total time ({self.slow_queries} slow):")
+        ranked = sorted(self.statements.items(), key=lambda kv: kv[1][0].total, reverse=True)[:top]
+        for (method, sql), (h, rows, shape) in ranked:
+            text = sql if len(sql) <= 120 else sql[:117] + '...'
+            lines.append(f"- [{method}] {h.count} runs, {h.total:.1f} ms total, {h.mean:.2f} ms mean, "
+                         f"{h.max:.1f} ms max, {rows} rows, params {shape}")
+            lines.append(f"  {text}")
+        return "\n".join(lines)
+
+def parameter_shape(params) -> str:
+    """Describe the parameters of a statement without their values."""
+    if not params:
+        return '()'
+    if isinstance(params, dict):
+        return '{' + ', '.join(sorted(params)) + '}'
+    types = [type(p).__name__ for p in params]
+    if len(types) > 6:
+        return f"{len(types)} x {'/'.join(sorted(set(types)))}"
+    return '(' + ', '.join(types) + ')'
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and placeholder lists so equivalent statements share one entry."""
+    sql = ' '.join(sql.split())
+    return re.sub(r'\?(?:\s*,\s*\?)+', '?, ...', sql)
+
+class QueryStats:
+    """Collects ExpenseManager call and statement timings.
+
+    Args:
+        slow_query_ms: Statements taking at least this long are logged;
+            None disables the slow-query log
+        slow_query_log: Path of the rotating slow-query log
+        stats_path: JSON file the aggregates are merged into; None keeps
+            them in memory only
+        flush_interval: Minimum seconds between merges into stats_path
+        max_log_bytes: Size at which the slow-query log is rotated
+        backup_count: Number of rotated slow-query logs kept
+    """
+
+    def __init__(self, slow_query_ms: float = None, slow_query_log: str = None, stats_path: str = None,
+                 flush_interval: float = 60.0, max_log_bytes: int = 1024 * 1024, backup_count: int = 3):
+        self.slow_query_ms = slow_query_ms
+        self.stats_path = stats_path
+        self.flush_interval = flush_interval
+        self.totals = StatsSnapshot()
+        self._pending = StatsSnapshot()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_flush = time.monotonic()
+        self._logger = None
+        if slow_query_ms is not None and slow_query_log:
+            import logging.handlers
+            self._logger = logging.getLogger(f"expenses.slow_queries.{id(self)}")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            handler = logging.handlers.RotatingFileHandler(
+                slow_query_log, maxBytes=max_log_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self._logger.addHandler(handler)
+
+    @classmethod
+    def from_env(cls, data_dir: str):
+        """Build a QueryStats from the EXPENSES_INSTRUMENT* variables, or None when disabled.
+
+        EXPENSES_INSTRUMENT=1 turns instrumentation on; EXPENSES_SLOW_QUERY_MS
+        sets the slow-query threshold (default 100). The log and stats file
+        are kept in data_dir.
+        """
+        if os.getenv('EXPENSES_INSTRUMENT', '').lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            slow_query_ms=float(os.getenv('EXPENSES_SLOW_QUERY_MS', '100')),
+            slow_query_log=os.path.join(data_dir, 'slow_queries.log'),
+            stats_path=os.path.join(data_dir, 'query_stats.json'),
+        )
+
+    def snapshot(self) -> StatsSnapshot:
+        """Copy of the aggregates recorded by this process so far."""
+        copy = StatsSnapshot()
+        with self._lock:
+            copy.merge(self.totals)
+        return copy
+
+    @property
+    def current_method(self) -> str:
+        return getattr(self._local, 'method', None) or '(other)'
+
+    @contextmanager
+    def timed(self, method: str):
+        """Time a method call; statements run inside it are attributed to it.
+
+        Nested calls (e.g. fetch_rows() -> iter_rows()) count towards the
+        outermost method only.
+        """
+        if getattr(self._local, 'method', None):
+            yield
+            return
+        self._local.method = method
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.method = None
+            self._observe_method(method, (time.perf_counter() - start) * 1000)
+
+    def timed_generator(self, method: str, gen):
+        """Like timed(), for a generator method such as iter_rows().
+
+        Only the time spent producing items counts, not the consumer's
+        work between them; statements run while the generator is resumed
+        are attributed to method. One call is recorded when the generator
+        finishes or is closed.
+        """
+        if getattr(self._local, 'method', None):
+            yield from gen
+            return
+        elapsed = 0.0
+        try:
+            while True:
+                self._local.method = method
+                start = time.perf_counter()
+                try:
+                    item = next(gen)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                    self._local.method = None
+                yield item
+        finally:
+            gen.close()
+            self._observe_method(method, elapsed * 1000)
+
+    def _observe_method(self, method: str, ms: float):
+        with self._lock:
+            self.totals.observe_method(method, ms)
+            self._pending.observe_method(method, ms)
+        self._maybe_flush()
+
+    def record_statement(self, sql: str, params, rows: int, ms: float, conn: sqlite3.Connection = None,
+                         many: int = None):
+        """Record one finished statement; called by InstrumentedCursor."""
+        method = self.current_method
+        shape = parameter_shape(params) if many is None else f"{many} x {parameter_shape(params)}"
+        key = normalize_sql(sql)
+        slow = self.slow_query_ms is not None and ms >= self.slow_query_ms
+        with self._lock:
+            self.totals.observe_statement(method, key, shape, rows, ms)
+            self._pending.observe_statement(method, key, shape, rows, ms)
+            if slow:
+                self.totals.slow_queries += 1
+                self._pending.slow_queries += 1
+        if slow and self._logger:
+            plan = self._explain(conn, sql, params) if many is None else None
+            message = f"[{method}] {ms:.1f} ms, {rows} rows, params {shape}\n    {' '.join(sql.split())}"
+            if plan:
+                message += "\n    plan: " + "\n          ".join(plan)
+            self._logger.info(message)
+
+    def _explain(self, conn, sql, params):
+        if conn is None or not sql.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+            return None
+        try:
+            # A plain cursor, so the EXPLAIN itself is not recorded
+            cur = sqlite3.Cursor(conn)
+            rows = cur.execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+            cur.close()
+        except sqlite3.Error as e:
+            return [f"unavailable ({e})"]
+        return [row[-1] for row in rows]
+
+    def _maybe_flush(self):
+        if self.stats_path and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Merge what was recorded since the last flush into the stats file."""
+        if not self.stats_path:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, StatsSnapshot()
+            self._last_flush = time.monotonic()
+        if not pending.methods and not pending.statements:
+            return
+        try:
+            stored = StatsSnapshot.load(self.stats_path)
+            stored.merge(pending)
+            tmp_path = self.stats_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as fh:
+                json.dump(stored.to_dict(), fh)
+            os.replace(tmp_path, self.stats_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Failed to save query stats: {e}")
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports every statement to its connection's QueryStats.
+
+    A SELECT is recorded once its rows are exhausted, the cursor is reused
+    or closed, so the time spent fetching and the number of rows returned
+    are included.
+    """
+    _pending = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, params)
+        except sqlite3.Error:
+            self._pending = [sql, params, 0, time.perf_counter() - start]
+            self._finish()
+            raise
+        self._pending = [sql, params, 0, time.perf_counter() - start]
+        if self.description is None:
+            # No result rows to wait for (INSERT, UPDATE, DDL, ...)
+            self._pending[2] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        seq_of_params = list(seq_of_params)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            stats = getattr(self.connection, 'stats', None)
+            if stats is not None:
+                stats.record_statement(sql, seq_of_params[0] if seq_of_params else (), max(self.rowcount, 0),
+                                       (time.perf_counter() - start) * 1000, many=len(seq_of_params))
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        if self._pending is not None:
+            self._pending[3] += time.perf_counter() - start
+        return result
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._pending is not None:
+            self._pending[2] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+        if self._pending is not None:
+            self._pending[2] += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._pending is not None:
+            self._pending[2] += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        stats = getattr(self.connection, 'stats', None)
+        if stats is not None:
+            sql, params, rows, seconds = pending
+            stats.record_statement(sql, params, rows, seconds * 1000, conn=self.connection)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors (including execute() shortcuts) are instrumented."""
+    stats = None
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        cur = self.cursor()
+        cur.executemany(sql, seq_of_params)
+        return cur
@@ -0,0 +1,244 @@
+"""Process-wide metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms live in a Registry (REGISTRY by default)
+and are rendered with Registry.render(). The bot exposes them either on a
+local HTTP port (METRICS_PORT) or by rewriting a file every few seconds
+(METRICS_FILE), see start_exporter(). Only the standard library is used.
+
+The metrics recorded by the bot and the expenses cog are defined at the
+bottom of this module so every part of the bot shares the same objects.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts, sum]
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_samples(self, items) -> list:
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    """Set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+def start_http_server(port: int, addr: str = '127.0.0.1', registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """Serve registry.render() on http://addr:port/metrics from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+def write_metrics_file(path: str, registry: Registry = REGISTRY):
+    """Atomically replace path with the current metrics (e.g. for node_exporter's textfile collector)."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        fh.write(registry.render())
+    os.replace(tmp_path, path)
+
+async def write_periodically(path: str, interval: float = 15.0, registry: Registry = REGISTRY):
+    while True:
+        try:
+            await asyncio.to_thread(write_metrics_file, path, registry)
+        except OSError as e:
+            print(f"Failed to write metrics to {path}: {e}")
+        await asyncio.sleep(interval)
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Measure how late the event loop wakes up from a sleep, forever."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0.0)
+        EVENT_LOOP_LAG.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
+
+def start_exporter() -> list:
+    """Start the exporters configured by METRICS_PORT / METRICS_FILE, plus the lag monitor.
+
+    Must be called from a running event loop. Returns the started tasks.
+    Nothing is started when neither variable is set.
+    """
+    port = os.getenv('METRICS_PORT')
+    path = os.getenv('METRICS_FILE')
+    if not port and not path:
+        return []
+    if port:
+        start_http_server(int(port), os.getenv('METRICS_ADDR', '127.0.0.1'))
+    tasks = [asyncio.create_task(monitor_event_loop_lag())]
+    if path:
+        interval = float(os.getenv('METRICS_INTERVAL', '15'))
+        tasks.append(asyncio.create_task(write_periodically(path, interval)))
+    return tasks
+
+# --- Metrics shared by the bot and the cogs ---
+COMMAND_LATENCY = REGISTRY.histogram(
+    'discord_command_duration_seconds',
+    'Time from command invocation to completion (or until a confirmation prompt is sent)',
+    ['cog', 'command', 'status'])
+COMMANDS_TOTAL = REGISTRY.counter(
+    'discord_commands_total', 'Commands invoked', ['cog', 'command', 'status'])
+INTERACTION_LATENCY = REGISTRY.histogram(
+    'discord_interaction_response_seconds',
+    'Time to handle a component interaction and send the response', ['view', 'action', 'status'])
+EMBED_BUILD = REGISTRY.histogram(
+    'expenses_embed_build_seconds', 'Time spent in ExpenseView.create_embed', ['mode'])
+TRANSFER_DURATION = REGISTRY.histogram(
+    'expenses_drive_transfer_seconds', 'Duration of database backup transfers', ['direction', 'status'],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+TRANSFER_BYTES = REGISTRY.counter(
+    'expenses_drive_transfer_bytes_total', 'Bytes moved by database backup transfers', ['direction'])
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    'asyncio_event_loop_lag_seconds', 'Delay of the event loop in waking up a sleeping task')
+EVENT_LOOP_LAG_LAST = REGISTRY.gauge(
+    'asyncio_event_loop_lag_last_seconds', 'Most recently measured event loop lag')
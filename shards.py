@@ -0,0 +1,139 @@
+"""Per-guild / per-user database shards for the Discord bot.
+
+With sharding enabled every tenant (a guild, or a user) gets its own SQLite
+file under data/shards/, so households and servers never see each other's
+expenses and no single file grows with the whole user base. ShardPool
+hands out one AsyncExpenseManager per shard and keeps at most max_open of
+them open. The limit is enforced when a manager opens (on its first call,
+through AsyncExpenseManager.before_open): the least recently used idle
+shard is released (connection closed, threads stopped) to make room, and
+the call waits if every open shard is busy. Shards idle for idle_timeout
+seconds are released too, and forgotten after another idle_timeout. A
+released manager reopens itself on its next call, under the same limit,
+so views that still hold one keep working.
+"""
+import asyncio
+import os
+import re
+import time
+from async_expense_manager import AsyncExpenseManager
+
+SHARD_MODES = ('guild', 'user')
+
+class ShardPool:
+    """Bounded LRU of AsyncExpenseManager instances, one per shard file."""
+
+    def __init__(self, directory: str, mode: str = 'guild', max_open: int = 32, idle_timeout: float = 600,
+                 **manager_kwargs):
+        """
+        Args:
+            directory: Folder holding the shard files (created if missing)
+            mode: 'guild' for one shard per server, 'user' for one per user
+            max_open: Most shards kept open at once
+            idle_timeout: Seconds without a call after which a shard is released
+            manager_kwargs: Arguments for every AsyncExpenseManager
+        """
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Shard mode must be one of {SHARD_MODES}, got '{mode}'")
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1")
+        self.directory = directory
+        self.mode = mode
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.manager_kwargs = manager_kwargs
+        self._managers = {}
+        # Managers whose threads were started through this pool
+        self._open = set()
+        self._open_lock = asyncio.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, data_dir: str, **manager_kwargs):
+        """Build the pool configured by EXPENSES_SHARD_BY, or return None if sharding is off.
+
+        EXPENSES_MAX_OPEN_SHARDS and EXPENSES_SHARD_IDLE_SECONDS override
+        the limits.
+
+        Raises:
+            ValueError: If EXPENSES_SHARD_BY is not 'guild' or 'user'
+        """
+        mode = os.getenv('EXPENSES_SHARD_BY', '').strip().lower()
+        if not mode:
+            return None
+        return cls(os.path.join(data_dir, 'shards'), mode,
+                   max_open=int(os.getenv('EXPENSES_MAX_OPEN_SHARDS', '32')),
+                   idle_timeout=float(os.getenv('EXPENSES_SHARD_IDLE_SECONDS', '600')),
+                   **manager_kwargs)
+
+    def key(self, guild_id, user_id) -> str:
+        """Return the shard name for a command, e.g. 'guild-1234' or 'user-5678'.
+
+        In guild mode, direct messages (no guild) go to the user's shard.
+        """
+        if self.mode == 'guild' and guild_id is not None:
+            return f"guild-{guild_id}"
+        return f"user-{user_id}"
+
+    def path(self, key: str) -> str:
+        """Database file of a shard."""
+        if not re.fullmatch(r'[A-Za-z0-9_-]+', key):
+            raise ValueError(f"Invalid shard name '{key}'")
+        return os.path.join(self.directory, f"{key}.db")
+
+    @property
+    def open_count(self) -> int:
+        self._open = {manager for manager in self._open if manager.is_open}
+        return len(self._open)
+
+    async def get(self, key: str) -> AsyncExpenseManager:
+        """Return the manager of a shard; it opens, within the limit, on its first call."""
+        manager = self._managers.get(key)
+        if manager is None:
+            manager = self._managers[key] = AsyncExpenseManager(self.path(key), **self.manager_kwargs)
+            manager.before_open = self._open_manager
+        manager.last_used = time.monotonic()
+        return manager
+
+    async def _open_manager(self, manager: AsyncExpenseManager):
+        """before_open hook: wait for a free slot, releasing idle shards, then open manager."""
+        async with self._open_lock:
+            while not manager.is_open:
+                if self.open_count < self.max_open:
+                    manager.open()
+                    self._open.add(manager)
+                    return
+                # Busy managers refuse to be released; try the next one
+                for candidate in sorted(self._open, key=lambda m: m.last_used):
+                    if await candidate.release():
+                        break
+                else:
+                    # Every open shard is running a call; wait for one to finish
+                    await asyncio.sleep(0.05)
+
+    async def release_idle(self) -> int:
+        """Release shards idle for longer than idle_timeout; return how many were released.
+
+        Shards already released and idle for another idle_timeout are
+        dropped from the pool, so it does not grow with every tenant seen.
+        """
+        now = time.monotonic()
+        released = 0
+        for manager in list(self._open):
+            if manager.is_open and manager.last_used < now - self.idle_timeout and await manager.release():
+                released += 1
+        for key, manager in list(self._managers.items()):
+            if not manager.is_open and not manager.busy and manager.last_used < now - 2 * self.idle_timeout:
+                del self._managers[key]
+        return released
+
+    async def run_evictor(self, interval: float = 60):
+        """Call release_idle() every interval seconds, forever."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.release_idle()
+
+    async def close(self):
+        """Close every shard."""
+        for manager in set(self._managers.values()) | self._open:
+            await manager.close()
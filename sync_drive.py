@@ -1,44 +1,509 @@
+import io
 import os
-from pydrive2.auth import GoogleAuth
-from pydrive2.drive import GoogleDrive
+import json
+import time
+import gzip
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+import asyncio
+import threading
 
 GDRIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gdrive')
+CHUNK_SIZE = 1024 * 1024
 
 _drive_instance = None
+_drive_lock = threading.Lock()
 
 def get_drive():
     global _drive_instance
-    if _drive_instance is None:
-        gauth = GoogleAuth(settings_file=os.path.join(GDRIVE_DIR, 'settings.yaml'))
-        gauth.LocalWebserverAuth()
-        _drive_instance = GoogleDrive(gauth)
+    with _drive_lock:
+        if _drive_instance is None:
+            from pydrive2.auth import GoogleAuth
+            from pydrive2.drive import GoogleDrive
+            gauth = GoogleAuth(settings_file=os.path.join(GDRIVE_DIR, 'settings.yaml'))
+            gauth.LocalWebserverAuth()
+            _drive_instance = GoogleDrive(gauth)
     return _drive_instance
 
-def upload_file(filename, content):
-    drive = get_drive()
-    try:
+class TransferProgress:
+    """Byte counter for a running transfer, safe to read from another thread."""
+
+    def __init__(self, total=None):
+        self.total = total
+        self.done = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    def update(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def throughput(self):
+        """Bytes per second since the transfer started."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    def describe(self):
+        done = f"{self.done / 1024:,.0f} KB"
+        if self.total:
+            done += f" / {self.total / 1024:,.0f} KB"
+        return f"{done} ({self.throughput / 1024:,.0f} KB/s)"
+
+class StorageBackend:
+    """Where database backups are stored. Subclasses raise on failure."""
+
+    def upload(self, filename, path, progress=None):
+        raise NotImplementedError
+
+    def download(self, filename, path, progress=None):
+        raise NotImplementedError
+
+    def upload_bytes(self, filename, data):
+        raise NotImplementedError
+
+    def download_bytes(self, filename):
+        raise NotImplementedError
+
+    def delete(self, filename):
+        raise NotImplementedError
+
+    def list_names(self, prefix):
+        """Return the set of stored file names starting with prefix."""
+        raise NotImplementedError
+
+class DriveBackend(StorageBackend):
+    """Google Drive storage through pydrive2, uploading in resumable chunks."""
+
+    def _service(self, drive):
+        if drive.auth.service is None:
+            drive.auth.Authorize()
+        return drive.auth.service
+
+    def _find(self, drive, filename):
         file_list = drive.ListFile({'q': f"title='{filename}' and trashed=false"}).GetList()
-        if file_list:
-            file = drive.CreateFile({'id': file_list[0]['id']})
-            file.SetContentFile(content)
-            file.Upload()
+        return file_list[0]['id'] if file_list else None
+
+    def upload(self, filename, path, progress=None):
+        from googleapiclient.http import MediaFileUpload
+        drive = get_drive()
+        file_id = self._find(drive, filename)
+        media = MediaFileUpload(path, resumable=True, chunksize=CHUNK_SIZE)
+        files = self._service(drive).files()
+        if file_id:
+            request = files.update(fileId=file_id, media_body=media)
         else:
-            file = drive.CreateFile({'title': filename})
-            file.SetContentFile(content)
-            file.Upload()
-    except Exception as e:
-        print(f"Error uploading file '{filename}': {e}")
-
-def get_file(filename, path=None):
-    drive = get_drive()
-    if path is None:
-        path = filename
-    try:
-        file_list = drive.ListFile({'q': f"title='{filename}' and trashed=false"}).GetList()
-        if not file_list:
+            request = files.insert(body={'title': filename}, media_body=media)
+
+        total = os.path.getsize(path)
+        response = None
+        while response is None:
+            status, response = request.next_chunk()
+            if progress and status:
+                progress.update(status.resumable_progress, total)
+        if progress:
+            progress.update(total, total)
+
+    def download(self, filename, path, progress=None):
+        from googleapiclient.http import MediaIoBaseDownload
+        drive = get_drive()
+        file_id = self._find(drive, filename)
+        if not file_id:
             raise FileNotFoundError(f"File '{filename}' not found in Google Drive.")
-        file = drive.CreateFile({'id': file_list[0]['id']})
-        file.GetContentFile(path)
-    except Exception as e:
-        print(f"Error downloading file '{filename}': {e}")
+        request = self._service(drive).files().get_media(fileId=file_id)
+        with open(path, 'wb') as fh:
+            downloader = MediaIoBaseDownload(fh, request, chunksize=CHUNK_SIZE)
+            done = False
+            while not done:
+                status, done = downloader.next_chunk()
+                if progress and status:
+                    progress.update(status.resumable_progress, status.total_size)
+
+    def upload_bytes(self, filename, data):
+        from googleapiclient.http import MediaIoBaseUpload
+        drive = get_drive()
+        file_id = self._find(drive, filename)
+        media = MediaIoBaseUpload(io.BytesIO(data), mimetype='application/octet-stream')
+        files = self._service(drive).files()
+        if file_id:
+            files.update(fileId=file_id, media_body=media).execute()
+        else:
+            files.insert(body={'title': filename}, media_body=media).execute()
+
+    def download_bytes(self, filename):
+        from googleapiclient.http import MediaIoBaseDownload
+        drive = get_drive()
+        file_id = self._find(drive, filename)
+        if not file_id:
+            raise FileNotFoundError(f"File '{filename}' not found in Google Drive.")
+        buffer = io.BytesIO()
+        downloader = MediaIoBaseDownload(buffer, self._service(drive).files().get_media(fileId=file_id))
+        done = False
+        while not done:
+            _, done = downloader.next_chunk()
+        return buffer.getvalue()
+
+    def delete(self, filename):
+        drive = get_drive()
+        file_id = self._find(drive, filename)
+        if file_id:
+            self._service(drive).files().delete(fileId=file_id).execute()
+
+    def list_names(self, prefix):
+        drive = get_drive()
+        file_list = drive.ListFile({'q': f"title contains '{prefix}' and trashed=false"}).GetList()
+        return {f['title'] for f in file_list if f['title'].startswith(prefix)}
+
+class LocalBackend(StorageBackend):
+    """Stores backups in a local directory; a stand-in for Drive when testing."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _copy(self, src, dst, progress):
+        total = os.path.getsize(src)
+        done = 0
+        with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+            while True:
+                chunk = fin.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                fout.write(chunk)
+                done += len(chunk)
+                if progress:
+                    progress.update(done, total)
+
+    def upload(self, filename, path, progress=None):
+        self._copy(path, os.path.join(self.directory, filename), progress)
+
+    def download(self, filename, path, progress=None):
+        src = os.path.join(self.directory, filename)
+        if not os.path.exists(src):
+            raise FileNotFoundError(f"File '{filename}' not found in {self.directory}.")
+        self._copy(src, path, progress)
+
+    def upload_bytes(self, filename, data):
+        with open(os.path.join(self.directory, filename), 'wb') as fh:
+            fh.write(data)
+
+    def download_bytes(self, filename):
+        src = os.path.join(self.directory, filename)
+        if not os.path.exists(src):
+            raise FileNotFoundError(f"File '{filename}' not found in {self.directory}.")
+        with open(src, 'rb') as fh:
+            return fh.read()
+
+    def delete(self, filename):
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except FileNotFoundError:
+            pass
+
+    def list_names(self, prefix):
+        return {name for name in os.listdir(self.directory) if name.startswith(prefix)}
+
+class DeltaBackend(StorageBackend):
+    """Incremental backups on top of another backend.
+
+    The file is split into fixed-size chunks stored under their SHA-256, and a
+    JSON manifest lists the chunk hashes in order. Only chunks the remote side
+    does not have yet are uploaded, and a restore only downloads chunks that
+    differ from the local copy, so transfers scale with the size of the change.
+    """
+
+    def __init__(self, backend, chunk_size=256 * 1024):
+        self.backend = backend
+        self.chunk_size = chunk_size
+
+    def _manifest_name(self, filename):
+        return f"{filename}.manifest.json"
+
+    def _chunk_prefix(self, filename):
+        return f"{filename}.chunk."
+
+    def _chunks(self, path):
+        """Yield (hash, data) for each chunk of a local file."""
+        with open(path, 'rb') as fh:
+            while True:
+                data = fh.read(self.chunk_size)
+                if not data:
+                    break
+                yield hashlib.sha256(data).hexdigest(), data
+
+    def upload(self, filename, path, progress=None):
+        prefix = self._chunk_prefix(filename)
+        stored = {name[len(prefix):] for name in self.backend.list_names(prefix)}
+
+        hashes = []
+        sent = 0
+        total = os.path.getsize(path)
+        for digest, data in self._chunks(path):
+            if digest not in stored:
+                self.backend.upload_bytes(prefix + digest, data)
+                stored.add(digest)
+                sent += len(data)
+            hashes.append(digest)
+            if progress:
+                progress.update(sent, total)
+
+        manifest = {'size': total, 'chunk_size': self.chunk_size, 'chunks': hashes}
+        self.backend.upload_bytes(self._manifest_name(filename), json.dumps(manifest).encode())
+
+        # Drop chunks the new manifest no longer references
+        for digest in stored - set(hashes):
+            self.backend.delete(prefix + digest)
+
+    def download(self, filename, path, progress=None):
+        manifest = json.loads(self.backend.download_bytes(self._manifest_name(filename)))
+        prefix = self._chunk_prefix(filename)
+
+        # Offsets of chunks the local copy already has; the data is read
+        # back when needed, so memory use stays at one chunk
+        local = {}
+        if os.path.exists(path) and manifest['chunk_size'] == self.chunk_size:
+            wanted = set(manifest['chunks'])
+            for index, (digest, _) in enumerate(self._chunks(path)):
+                if digest in wanted:
+                    local.setdefault(digest, index * self.chunk_size)
+        # Offsets of chunks already written to the .part file (repeated chunks)
+        written = {}
+
+        tmp_path = path + '.part'
+        received = 0
+        with open(path, 'rb') if local else io.BytesIO() as src, open(tmp_path, 'w+b') as fh:
+            for digest in manifest['chunks']:
+                if digest in local:
+                    src.seek(local[digest])
+                    data = src.read(self.chunk_size)
+                elif digest in written:
+                    position = fh.tell()
+                    fh.seek(written[digest])
+                    data = fh.read(self.chunk_size)
+                    fh.seek(position)
+                else:
+                    data = self.backend.download_bytes(prefix + digest)
+                    if hashlib.sha256(data).hexdigest() != digest:
+                        raise ValueError(f"Chunk {digest} of '{filename}' is corrupted.")
+                    received += len(data)
+                written.setdefault(digest, fh.tell())
+                fh.write(data)
+                if progress:
+                    progress.update(received, manifest['size'])
+
+        if os.path.getsize(tmp_path) != manifest['size']:
+            os.remove(tmp_path)
+            raise ValueError(f"Restored '{filename}' does not match its manifest size.")
+        os.replace(tmp_path, path)
+
+_backend = None
+
+def get_backend():
+    """Return the configured backend: LocalBackend if STORAGE_DIR is set, else Drive.
+
+    Setting DELTA_BACKUP=1 wraps it in a DeltaBackend.
+    """
+    global _backend
+    if _backend is None:
+        storage_dir = os.getenv('STORAGE_DIR')
+        _backend = LocalBackend(storage_dir) if storage_dir else DriveBackend()
+        if os.getenv('DELTA_BACKUP', '').lower() in ('1', 'true', 'yes'):
+            _backend = DeltaBackend(_backend)
+    return _backend
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+def _compress_enabled(compress, backend):
+    # A gzip stream changes from the first modified byte on, so it would
+    # defeat DeltaBackend's chunk reuse; delta backups are never compressed
+    if isinstance(backend, DeltaBackend):
+        return False
+    if compress is None:
+        return os.getenv('BACKUP_COMPRESS', '').lower() in ('1', 'true', 'yes')
+    return compress
+
+def snapshot_database(db_path, dest_path, pages=256, compress=False):
+    """Copy a live SQLite database with the online backup API.
+
+    The copy is made `pages` pages at a time so writers are only blocked
+    briefly, and it is consistent even if they commit meanwhile.
+
+    Raises:
+        FileNotFoundError: If db_path does not exist; connecting would
+            create an empty database and upload it over the last backup
+    """
+    if not os.path.isfile(db_path):
+        raise FileNotFoundError(f"Database '{db_path}' not found")
+    src = sqlite3.connect(db_path)
+    try:
+        if compress:
+            fd, raw_path = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(dest_path))
+            os.close(fd)
+        else:
+            raw_path = dest_path
+        dst = sqlite3.connect(raw_path)
+        try:
+            src.backup(dst, pages=pages, sleep=0.005)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+    if compress:
+        with open(raw_path, 'rb') as fin, gzip.open(dest_path, 'wb') as fout:
+            shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+        os.remove(raw_path)
+    return dest_path
+
+def verify_database(path):
+    """Raise ValueError unless path is an SQLite database that passes integrity_check."""
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            result = conn.execute("PRAGMA integrity_check;").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        raise ValueError(f"Downloaded database is not valid: {e}")
+    if not result or result[0] != 'ok':
+        raise ValueError(f"Downloaded database failed integrity check: {result[0] if result else 'no result'}")
+
+def save_database(filename, db_path, progress=None, backend=None, compress=None):
+    """Upload a consistent snapshot of db_path, gzipped if compress (or BACKUP_COMPRESS) is set.
+
+    Snapshots sent through a DeltaBackend are never compressed.
+    """
+    backend = backend or get_backend()
+    compress = _compress_enabled(compress, backend)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot = snapshot_database(db_path, os.path.join(tmp_dir, filename), compress=compress)
+        backend.upload(filename + '.gz' if compress else filename, snapshot, progress)
+
+def download_database(filename, db_path, progress=None, backend=None, compress=None):
+    """Download a backup next to db_path and verify it; return the verified file's path.
+
+    The live database is left untouched, see install_database().
+    """
+    backend = backend or get_backend()
+    compress = _compress_enabled(compress, backend)
+    fd, tmp_path = tempfile.mkstemp(suffix='.download', dir=os.path.dirname(os.path.abspath(db_path)))
+    os.close(fd)
+    try:
+        if isinstance(backend, DeltaBackend) and os.path.exists(db_path):
+            # Lets the delta restore reuse the chunks we already have
+            shutil.copyfile(db_path, tmp_path)
+        backend.download(filename + '.gz' if compress else filename, tmp_path, progress)
+        if compress:
+            with gzip.open(tmp_path, 'rb') as fin, open(tmp_path + '.db', 'wb') as fout:
+                shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+            os.replace(tmp_path + '.db', tmp_path)
+        verify_database(tmp_path)
+        return tmp_path
+    except BaseException:
+        for leftover in (tmp_path, tmp_path + '.db'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+
+def _checkpoint(db_path):
+    """Fold db_path's WAL into the file; raise OSError if another connection is using it."""
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            busy = conn.execute("PRAGMA wal_checkpoint(TRUNCATE);").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.OperationalError as e:
+        raise OSError(f"Database '{db_path}' is in use: {e}")
+    except sqlite3.DatabaseError:
+        # A damaged file is about to be replaced anyway
+        return
+    if busy:
+        raise OSError(f"Database '{db_path}' is in use by another connection")
+
+def install_database(new_path, db_path):
+    """Atomically replace db_path with a verified download.
+
+    db_path must not be open anywhere else, in this process or another
+    one: its -wal and -shm files are deleted, and a connection that stays
+    open keeps using the old file and loses what it writes. Close your own
+    connections first. The WAL is checkpointed before anything is removed,
+    which fails while another connection is reading or writing.
+
+    Raises:
+        OSError: If the database is in use
+    """
+    if os.path.exists(db_path):
+        _checkpoint(db_path)
+    for suffix in ('-journal', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(new_path, db_path)
+
+def restore_database(filename, db_path, progress=None, backend=None, compress=None):
+    install_database(download_database(filename, db_path, progress, backend, compress), db_path)
+
+class BackgroundTransfers:
+    """Runs uploads and downloads in worker threads for an asyncio caller.
+
+    Saves of the same file are coalesced: while one upload is running, any
+    number of new save requests share a single follow-up upload, so the last
+    requester always gets a copy that includes its changes.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._running = {}
+        self._pending = {}
+
+    def _get_backend(self):
+        return self.backend or get_backend()
+
+    def save(self, filename, path):
+        """Schedule a snapshot upload and return (task, progress); await the task for the result."""
+        if filename in self._pending:
+            return self._pending[filename]
+        running = self._running.get(filename)
+        if running and not running[0].done():
+            progress = TransferProgress()
+            task = asyncio.ensure_future(self._save_after(running[0], filename, path, progress))
+            self._pending[filename] = (task, progress)
+            return task, progress
+
+        progress = TransferProgress()
+        task = asyncio.ensure_future(asyncio.to_thread(save_database, filename, path, progress, self._get_backend()))
+        task.add_done_callback(lambda _: setattr(progress, 'finished', time.monotonic()))
+        self._running[filename] = (task, progress)
+        return task, progress
+
+    async def _save_after(self, previous, filename, path, progress):
+        try:
+            await asyncio.shield(previous)
+        except Exception:
+            pass
+        self._pending.pop(filename, None)
+        progress.started = time.monotonic()
+        self._running[filename] = (asyncio.current_task(), progress)
+        try:
+            await asyncio.to_thread(save_database, filename, path, progress, self._get_backend())
+        finally:
+            progress.finished = time.monotonic()
+
+    def load(self, filename, path):
+        """Schedule a verified download and return (task, progress).
 
+        The task's result is the path of the downloaded copy, ready for
+        install_database() once the database connection is closed.
+        """
+        progress = TransferProgress()
+        task = asyncio.ensure_future(asyncio.to_thread(download_database, filename, path, progress, self._get_backend()))
+        task.add_done_callback(lambda _: setattr(progress, 'finished', time.monotonic()))
+        return task, progress
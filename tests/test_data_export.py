@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from data_export import import_statement, parse_price
+from expense_manager import ExpenseManager
+
+class ParsePriceTest(unittest.TestCase):
+    def test_thousands_separator_is_removed(self):
+        self.assertEqual(parse_price('Rp 1.250.000'), 1250000)
+
+    def test_decimal_part_is_rounded(self):
+        self.assertEqual(parse_price('-25.000,50', thousands='.', decimal=','), -25000)
+        self.assertEqual(parse_price('1,234.56', thousands=',', decimal='.'), 1235)
+
+    def test_same_separators_are_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_price('1234.56', thousands='.', decimal='.')
+
+class ImportStatementTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = ExpenseManager(os.path.join(self.tmp_dir.name, 'expenses.db'))
+        self.path = os.path.join(self.tmp_dir.name, 'statement.csv')
+        with open(self.path, 'w', encoding='utf-8') as fh:
+            fh.write('date,item,price\n2025-01-15,Kopi,1234.56\n')
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_same_separators_stop_the_import(self):
+        columns = {'date': 'date', 'item': 'item', 'price': 'price'}
+        with self.assertRaises(ValueError):
+            import_statement(self.db, self.path, columns, thousands='.', decimal='.', category='Food')
+        self.assertEqual(self.db.count(), 0)
+
+    def test_decimal_prices_are_imported(self):
+        columns = {'date': 'date', 'item': 'item', 'price': 'price'}
+        self.assertEqual(import_statement(self.db, self.path, columns, thousands=',', decimal='.', category='Food'),
+                         (1, 0))
+        self.assertEqual(self.db.fetch_rows()[0].price, 1235)
+
+if __name__ == '__main__':
+    unittest.main()
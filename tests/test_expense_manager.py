@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from expense_manager import ExpenseManager
+
+class RollupTriggerPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = ExpenseManager(os.path.join(self.tmp_dir.name, 'expenses.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_daily_min_max_recompute_seeks_one_day(self):
+        # The statement the delete/update triggers run when a day's extreme price is removed
+        for aggregate in ('MIN', 'MAX'):
+            plan = self.db.conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT {aggregate}(price) FROM expenses WHERE date = ? AND category_id = ?;",
+                ('2025-01-15', 1)).fetchall()
+            detail = ' '.join(row[-1] for row in plan)
+            self.assertIn('idx_expenses_date_category_price (date=? AND category_id=?)', detail)
+
+    def test_rollups_follow_deleted_extremes(self):
+        self.db.add_many([('2025-01-15', 'a', 1000, 'Food'), ('2025-01-15', 'b', 5000, 'Food'),
+                          ('2025-01-15', 'c', 3000, 'Food')])
+        ids = [row.id for row in self.db.fetch_rows(orderby='price')]
+        self.db.delete_many([ids[0], ids[-1]])
+        row = self.db.conn.execute(
+            "SELECT transaction_count, total_amount, min_amount, max_amount FROM rollup_daily;").fetchone()
+        self.assertEqual(row, (1, 3000, 3000, 3000))
+
+class DeleteManyTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = ExpenseManager(os.path.join(self.tmp_dir.name, 'expenses.db'))
+        self.db.add_many([('2025-01-15', 'a', 1000, 'Food'), ('2025-01-16', 'b', 2000, 'Food')])
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_invalid_ids_raise_invalid_input(self):
+        for ids in ([1, 'a'], [1, None], [1, [2]], [0], [-1]):
+            with self.assertRaises(ExpenseManager.InvalidInputError):
+                self.db.delete_many(ids)
+        self.assertEqual(self.db.count(), 2)
+
+    def test_duplicates_and_missing_ids(self):
+        self.assertEqual(self.db.delete_many(iter([2, 1, 2, 9])), ([1, 2], [9]))
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = ExpenseManager(os.path.join(self.tmp_dir.name, 'expenses.db'))
+        self.db.add('2025-01-15', 'a', 1000, 'Food')
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_cached_rows_cannot_be_modified(self):
+        expected = [(1, '2025-01-15', 'a', 1000, 'Food')]
+        rows = self.db.fetch_rows()
+        with self.assertRaises(AttributeError):
+            rows[0].price = 1
+        rows.clear()
+        page, _ = self.db.fetch_page(as_rows=True)
+        page.clear()
+        self.assertEqual(self.db.fetch_rows(), expected)
+        self.assertEqual(self.db.fetch_page(as_rows=True), (expected, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+from expense_manager import ExpenseManager
+from instrumentation import QueryStats
+
+class QueryStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.stats = QueryStats()
+        self.db = ExpenseManager(os.path.join(self.tmp_dir.name, 'expenses.db'), stats=self.stats)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def test_schema_setup_is_not_recorded(self):
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot.methods, {})
+        self.assertEqual(snapshot.statements, {})
+
+    def test_calls_are_recorded_after_setup(self):
+        self.db.add('2025-01-15', 'a', 1000, 'Food')
+        snapshot = self.stats.snapshot()
+        self.assertIn('add', snapshot.methods)
+        self.assertTrue(any(method == 'add' for method, _ in snapshot.statements))
+
+if __name__ == '__main__':
+    unittest.main()
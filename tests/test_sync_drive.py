@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from sync_drive import install_database, snapshot_database
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_missing_database_is_not_snapshotted(self):
+        db_path = os.path.join(self.tmp_dir.name, 'missing.db')
+        with self.assertRaises(FileNotFoundError):
+            snapshot_database(db_path, os.path.join(self.tmp_dir.name, 'backup.db'))
+        self.assertFalse(os.path.exists(db_path))
+
+class InstallDatabaseTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'expenses.db')
+        self.new_path = os.path.join(self.tmp_dir.name, 'download.db')
+        for path, value in ((self.db_path, 'old'), (self.new_path, 'new')):
+            conn = sqlite3.connect(path)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute("CREATE TABLE t (v TEXT);")
+            conn.execute("INSERT INTO t VALUES (?);", (value,))
+            conn.commit()
+            conn.close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT v FROM t;").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_replaces_closed_database(self):
+        install_database(self.new_path, self.db_path)
+        self.assertEqual(self.read(), 'new')
+        self.assertFalse(os.path.exists(self.db_path + '-wal'))
+
+    def test_refuses_database_in_use(self):
+        reader = sqlite3.connect(self.db_path)
+        try:
+            reader.execute("BEGIN;")
+            reader.execute("SELECT v FROM t;").fetchone()
+            writer = sqlite3.connect(self.db_path)
+            writer.execute("INSERT INTO t VALUES ('unsaved');")
+            writer.commit()
+            writer.close()
+            with self.assertRaises(OSError):
+                install_database(self.new_path, self.db_path)
+        finally:
+            reader.close()
+        self.assertEqual(self.read(), 'old')
+        self.assertTrue(os.path.exists(self.new_path))
+
+if __name__ == '__main__':
+    unittest.main()